@@ -0,0 +1,70 @@
+"""
+Versions asynchrones des opérations CRUD
+
+Chaque fonction exécute la fonction synchrone de ``crud`` via
+``AsyncSession.run_sync`` : les requêtes passent par le pilote asynchrone
+(asyncpg) sans bloquer la boucle d'événements, et la logique métier reste
+écrite une seule fois dans ``crud``. Le hachage bcrypt, lui, est calculé
+dans le pool de ``hashing`` avant d'entrer dans la session.
+"""
+import functools
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+import auth
+import crud
+import models
+import schemas
+
+
+def _run_sync(function):
+    """Envelopper une fonction CRUD synchrone pour une AsyncSession"""
+    @functools.wraps(function)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(function, *args, **kwargs)
+    return wrapper
+
+
+# User CRUD operations
+get_user_by_username = _run_sync(crud.get_user_by_username)
+get_user_by_email = _run_sync(crud.get_user_by_email)
+get_users = _run_sync(crud.get_users)
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    """Créer un utilisateur, le hachage bcrypt étant fait dans le pool dédié"""
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await db.run_sync(crud.create_user, user, hashed_password=hashed_password)
+
+
+async def update_user(
+    db: AsyncSession,
+    user_id: int,
+    user_update: schemas.UserUpdate
+) -> Optional[models.User]:
+    """Mettre à jour un utilisateur, le hachage bcrypt étant fait dans le pool dédié"""
+    hashed_password = None
+    if user_update.password:
+        hashed_password = await auth.get_password_hash_async(user_update.password)
+    return await db.run_sync(
+        crud.update_user, user_id, user_update, hashed_password=hashed_password
+    )
+
+
+delete_user = _run_sync(crud.delete_user)
+
+# TPE CRUD operations
+get_tpe = _run_sync(crud.get_tpe)
+get_tpe_by_shop_id = _run_sync(crud.get_tpe_by_shop_id)
+get_tpe_last_modified = _run_sync(crud.get_tpe_last_modified)
+get_tpes = _run_sync(crud.get_tpes)
+get_tpes_keyset = _run_sync(crud.get_tpes_keyset)
+get_tpe_changes = _run_sync(crud.get_tpe_changes)
+get_tpes_by_card_serial = _run_sync(crud.get_tpes_by_card_serial)
+get_tpes_by_card_number = _run_sync(crud.get_tpes_by_card_number)
+create_tpe = _run_sync(crud.create_tpe)
+update_tpe = _run_sync(crud.update_tpe)
+delete_tpe = _run_sync(crud.delete_tpe)
+bulk_update_tpes = _run_sync(crud.bulk_update_tpes)
+bulk_delete_tpes = _run_sync(crud.bulk_delete_tpes)
+get_tpe_version = _run_sync(crud.get_tpe_version)
+get_tpe_stats = _run_sync(crud.get_tpe_stats)
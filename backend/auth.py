@@ -1,12 +1,18 @@
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import Optional
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from config import get_settings
+import cache
+import hashing
 import models
 import schemas
 
@@ -29,6 +35,72 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Vérifier un mot de passe dans le pool de hachage"""
+    return await hashing.pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hacher un mot de passe dans le pool de hachage"""
+    return await hashing.pool.run(get_password_hash, password)
+
+
+class LoginThrottle:
+    """Échecs de connexion récents par clé (utilisateur et/ou client), en fenêtre glissante"""
+    
+    def __init__(self, max_failures: int, window_seconds: int, max_keys: int = 10000):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _recent(self, key, now: float) -> deque:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window_seconds:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+    
+    def retry_after(self, key) -> int:
+        """Secondes avant une nouvelle tentative (0 si autorisée)"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if len(failures) < self.max_failures:
+                return 0
+            return max(1, int(failures[0] + self.window_seconds - now) + 1)
+    
+    def record_failure(self, key) -> None:
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.setdefault(key, deque())
+            failures.append(now)
+            self._failures.move_to_end(key)
+            # Borner la mémoire : oublier les clés les plus anciennes
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+    
+    def reset(self, key) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+login_throttle = LoginThrottle(
+    max_failures=settings.LOGIN_MAX_FAILURES,
+    window_seconds=settings.LOGIN_FAILURE_WINDOW_SECONDS
+)
+
+# Essais répartis sur de nombreux comptes depuis une même adresse
+client_login_throttle = LoginThrottle(
+    max_failures=settings.LOGIN_MAX_FAILURES_PER_CLIENT,
+    window_seconds=settings.LOGIN_FAILURE_WINDOW_SECONDS
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Créer un token JWT"""
     to_encode = data.copy()
@@ -42,21 +114,107 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def authenticate_user(db: Session, username: str, password: str):
+async def get_user(db: AsyncSession, username: str) -> Optional[models.User]:
+    """Récupérer un utilisateur par nom d'utilisateur (session asynchrone)"""
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authentifier un utilisateur"""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
 
+class UserCache:
+    """Cache LRU à durée de vie limitée des utilisateurs authentifiés
+    
+    Le cache suit la version de l'étiquette ``users`` (incrémentée en base
+    par toute écriture sur un utilisateur), relue au plus une fois toutes les
+    ``version_check_seconds`` : un changement de version vide le cache, si
+    bien qu'une modification faite par un autre worker s'applique dans ce
+    délai sans requête en base à chaque appel.
+    """
+    
+    def __init__(self, ttl_seconds: int, max_size: int, version_check_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.version_check_seconds = version_check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+    
+    def version_expired(self) -> bool:
+        """Version de l'étiquette users à relire en base"""
+        return (
+            self._version is None
+            or time.monotonic() - self._version_checked_at >= self.version_check_seconds
+        )
+    
+    def set_version(self, version: int) -> None:
+        """Enregistrer la version lue ; vider le cache si elle a changé"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._version_checked_at = time.monotonic()
+    
+    def get(self, username: str) -> Optional[schemas.CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return user
+    
+    def set(self, user: schemas.CurrentUser) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[user.username] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self._entries.pop(username, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    version_check_seconds=settings.USER_CACHE_VERSION_CHECK_SECONDS
+)
+
+
+def token_claims(user: models.User) -> dict:
+    """Claims JWT d'un utilisateur (identité et rôle)"""
+    return {"sub": user.username, "uid": user.id, "role": user.role}
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
-    """Obtenir l'utilisateur courant depuis le token JWT"""
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.CurrentUser:
+    """Obtenir l'utilisateur courant depuis le token JWT (cache, puis base)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -72,9 +230,28 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    # Mode sans base : rôle et identité pris dans le token (les
+    # changements ne s'appliquent qu'à l'expiration du token)
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "uid" in payload and "role" in payload:
+        return schemas.CurrentUser(
+            id=payload["uid"],
+            username=token_data.username,
+            role=payload["role"],
+            is_active=True
+        )
+    
+    user = None
+    if user_cache.enabled:
+        if user_cache.version_expired():
+            versions = await db.run_sync(cache.tag_versions, [cache.USERS_TAG])
+            user_cache.set_version(versions[cache.USERS_TAG])
+        user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        db_user = await get_user(db, token_data.username)
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(user)
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -83,8 +260,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: models.User = Depends(get_current_user)
-) -> models.User:
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+) -> schemas.CurrentUser:
     """Vérifier que l'utilisateur est actif"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -92,8 +269,8 @@ async def get_current_active_user(
 
 
 async def get_current_admin_user(
-    current_user: models.User = Depends(get_current_user)
-) -> models.User:
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+) -> schemas.CurrentUser:
     """Vérifier que l'utilisateur est admin"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks de la sérialisation des listes de TPE (ORM -> JSON)
+Usage: python benchmarks/bench_serialization.py [--sizes 10,100,10000]
+           [--rounds 7] [--output benchmarks/baselines/serialization.json]
+
+Aucune base ni serveur : les TPE sont des objets ORM transitoires générés
+comme par seed_fleet.py. Pour chaque taille de page, deux chemins sont
+chronométrés étape par étape :
+
+- standard : ``schemas.TPE`` par ligne (from_attributes), dump JSON,
+  revalidation FastAPI contre ``response_model`` puis encodage json ;
+- rapide : projection directe (serializers.tpe_to_dict) puis encodage
+  de FastJSONResponse (orjson si installé).
+
+Les deux chemins doivent produire le même JSON ; c'est vérifié avant mesure.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple, Union
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import models
+import schemas
+import serializers
+from seed_fleet import generate_tpe
+
+# Budget de chaque mesure : assez d'itérations pour ~0,2 s par tour
+ROUND_SECONDS = 0.2
+
+# Même modèle de réponse que GET /api/tpe/
+RESPONSE_FIELD = create_response_field(
+    name="Response_Get_Tpes_Api_Tpe__Get",
+    type_=Union[schemas.PaginatedTPE, schemas.CursorPageTPE],
+)
+
+
+def build_tpes(size: int, seed: int) -> List[models.TPE]:
+    """TPE ORM transitoires (comme chargés par une requête de liste)"""
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tpes = []
+    for index in range(size):
+        tpe = models.TPE(**generate_tpe(rng, f"BENCH-{index:07d}"))
+        tpe.id = index + 1
+        tpe.created_at = created + timedelta(minutes=index, microseconds=rng.randrange(10 ** 6))
+        tpe.updated_at = tpe.created_at + timedelta(days=1) if rng.random() < 0.5 else None
+        tpes.append(tpe)
+    return tpes
+
+
+def _page(items: list, size: int) -> dict:
+    return {"items": items, "total": size, "page": 1, "page_size": size, "total_pages": 1}
+
+
+def standard_stages(tpes: list, loop) -> Tuple[Dict[str, Callable[[], None]], dict]:
+    """Étapes du chemin standard, chacune sur le résultat de la précédente"""
+    size = len(tpes)
+    state = {}
+
+    def validate():
+        state["models"] = [schemas.TPE.model_validate(tpe) for tpe in tpes]
+
+    def dump():
+        state["content"] = _page([model.model_dump(mode="json") for model in state["models"]], size)
+
+    def response_model():
+        state["serialized"] = loop.run_until_complete(
+            serialize_response(field=RESPONSE_FIELD, response_content=state["content"], is_coroutine=True)
+        )
+
+    def encode():
+        state["body"] = JSONResponse(state["serialized"]).body
+
+    return {"validate": validate, "dump": dump, "response_model": response_model, "encode": encode}, state
+
+
+def fast_stages(tpes: list) -> Tuple[Dict[str, Callable[[], None]], dict]:
+    """Étapes du chemin rapide"""
+    size = len(tpes)
+    state = {}
+
+    def project():
+        state["content"] = _page(serializers.tpes_to_list(tpes), size)
+
+    def encode():
+        state["body"] = serializers.FastJSONResponse(state["content"]).body
+
+    return {"project": project, "encode": encode}, state
+
+
+def run_pipeline(stages: Dict[str, Callable[[], None]], state: dict) -> bytes:
+    """Enchaîner les étapes une fois et renvoyer le corps produit"""
+    for stage in stages.values():
+        stage()
+    return state["body"]
+
+
+def measure(stages: Dict[str, Callable[[], None]], rounds: int) -> Dict[str, float]:
+    """Médiane par étape (ms), étapes enchaînées comme en production"""
+    # Calibrage : itérations nécessaires pour ~ROUND_SECONDS par tour
+    start = time.perf_counter()
+    for stage in stages.values():
+        stage()
+    single = max(time.perf_counter() - start, 1e-6)
+    iterations = max(1, int(ROUND_SECONDS / single))
+
+    timings = {name: [] for name in stages}
+    for _ in range(rounds):
+        totals = dict.fromkeys(stages, 0.0)
+        for _ in range(iterations):
+            for name, stage in stages.items():
+                start = time.perf_counter()
+                stage()
+                totals[name] += time.perf_counter() - start
+        for name, total in totals.items():
+            timings[name].append(total / iterations)
+
+    result = {name: round(statistics.median(values) * 1000, 4) for name, values in timings.items()}
+    result["total"] = round(sum(result.values()), 4)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de la sérialisation des TPE")
+    parser.add_argument("--sizes", default="10,100,10000", help="Tailles de page séparées par des virgules")
+    parser.add_argument("--rounds", type=int, default=7, help="Tours de mesure (médiane)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier JSON où enregistrer le résultat")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    loop = asyncio.new_event_loop()
+
+    print("=== TPE Manager - Sérialisation ===")
+    print(f"Encodeur du chemin rapide : {'orjson' if serializers.orjson else 'json'}\n")
+
+    results = {}
+    try:
+        for size in sizes:
+            tpes = build_tpes(size, args.seed)
+            standard, standard_state = standard_stages(tpes, loop)
+            fast, fast_state = fast_stages(tpes)
+
+            # Même JSON des deux côtés
+            body = run_pipeline(fast, fast_state)
+            if json.loads(run_pipeline(standard, standard_state)) != json.loads(body):
+                print(f"❌ Sorties différentes pour {size} TPE")
+                return 1
+
+            standard_result = measure(standard, args.rounds)
+            fast_result = measure(fast, args.rounds)
+            speedup = standard_result["total"] / fast_result["total"] if fast_result["total"] else 0.0
+            results[str(size)] = {
+                "standard_ms": standard_result,
+                "fast_ms": fast_result,
+                "speedup": round(speedup, 2),
+                "body_bytes": len(body),
+            }
+
+            print(f"{size} TPE ({results[str(size)]['body_bytes']} octets)")
+            for label, stage_result in (("standard", standard_result), ("rapide", fast_result)):
+                stages = "  ".join(f"{name} {value:.3f}" for name, value in stage_result.items() if name != "total")
+                print(f"  {label:<9} {stage_result['total']:>10.3f} ms   ({stages})")
+            print(f"  gain      x{speedup:.1f}\n")
+    finally:
+        loop.close()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "encoder": "orjson" if serializers.orjson else "json",
+                "sizes": results,
+            }, output, indent=2)
+        print(f"✓ Résultat enregistré dans {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
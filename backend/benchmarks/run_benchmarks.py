@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de l'API : charge concurrente et comparaison à une référence
+Usage: python benchmarks/run_benchmarks.py [--url http://localhost:8000]
+           [--concurrency 16] [--requests 400] [--scenarios list_search,stats]
+           [--output benchmarks/baselines/v1.json] [--compare benchmarks/baselines/v1.json]
+
+Sans --url, l'application est chargée dans ce processus (transport ASGI,
+sans réseau) sur la base configurée par les variables POSTGRES_* : la
+mémoire maximale (RSS) mesurée est alors celle de l'API. Avec --url, le
+serveur est sollicité en HTTP ; --server-pid permet de relever son pic RSS.
+
+Chaque scénario est joué successivement par --concurrency clients
+simultanés ; le rapport donne p50/p95/p99, débit et erreurs. --output
+enregistre le résultat (JSON) et --compare signale les régressions au-delà
+de --threshold (code retour 1).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from seed_fleet import SERVICES, DISTRICTS, LAST_NAMES, generate_tpe
+
+RESULT_FORMAT_VERSION = 1
+PAGE_SIZE = 50
+
+# Termes de recherche : noms de service, quartiers, régisseurs, préfixes
+SEARCH_TERMS = (
+    [service.split()[0] for service in SERVICES]
+    + DISTRICTS
+    + LAST_NAMES
+    + ["bench-00", "mediatheque", "piscine nord", "move"]
+)
+
+
+class Context:
+    """État partagé par les scénarios (jeton, ids connus, curseurs)"""
+
+    def __init__(self, args, client: httpx.AsyncClient):
+        self.args = args
+        self.client = client
+        self.token: Optional[str] = None
+        self.ids: List[int] = []
+        self.total = 0
+        self.rng = random.Random(args.seed)
+        self.run_id = datetime.now().strftime("%H%M%S")
+        self.created = itertools.count()
+        self.cursors: Dict[int, Optional[str]] = {}
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def login(self) -> httpx.Response:
+        return await self.client.post(
+            "/api/auth/login",
+            data={"username": self.args.username, "password": self.args.password},
+        )
+
+    async def prepare(self) -> None:
+        """Jeton d'accès et échantillon d'ids répartis sur tout le parc"""
+        response = await self.login()
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+        response = await self.client.get("/api/tpe/stats/summary", headers=self.headers)
+        response.raise_for_status()
+        self.total = response.json()["total"]
+        if not self.total:
+            raise SystemExit("❌ Aucun TPE en base : lancer d'abord benchmarks/seed_fleet.py")
+
+        pages = max(1, self.total // PAGE_SIZE)
+        for page in sorted({self.rng.randrange(1, pages + 1) for _ in range(20)}):
+            response = await self.client.get(
+                "/api/tpe/", params={"page": page, "page_size": PAGE_SIZE}, headers=self.headers
+            )
+            response.raise_for_status()
+            self.ids.extend(item["id"] for item in response.json()["items"])
+
+
+# Scénarios : une requête par appel, (contexte, numéro du client) -> réponse
+Scenario = Callable[[Context, int], Awaitable[httpx.Response]]
+
+
+async def scenario_login(ctx: Context, worker: int) -> httpx.Response:
+    return await ctx.login()
+
+
+async def scenario_list_first_page(ctx: Context, worker: int) -> httpx.Response:
+    return await ctx.client.get("/api/tpe/", params={"page_size": PAGE_SIZE}, headers=ctx.headers)
+
+
+async def scenario_list_summary(ctx: Context, worker: int) -> httpx.Response:
+    params = {"page": ctx.rng.randrange(1, 21), "page_size": PAGE_SIZE, "fields": "summary"}
+    return await ctx.client.get("/api/tpe/", params=params, headers=ctx.headers)
+
+
+async def scenario_list_search(ctx: Context, worker: int) -> httpx.Response:
+    params = {"search": ctx.rng.choice(SEARCH_TERMS), "page_size": PAGE_SIZE}
+    return await ctx.client.get("/api/tpe/", params=params, headers=ctx.headers)
+
+
+async def scenario_list_filter(ctx: Context, worker: int) -> httpx.Response:
+    params = {
+        "tpe_model": ctx.rng.choice(["Ingenico Desk 5000", "Ingenico Move 5000"]),
+        "connection_type": ctx.rng.choice(["ethernet", "4g5g"]),
+        "page_size": PAGE_SIZE,
+    }
+    return await ctx.client.get("/api/tpe/", params=params, headers=ctx.headers)
+
+
+async def scenario_list_deep_offset(ctx: Context, worker: int) -> httpx.Response:
+    # Pages situées dans la seconde moitié du parc
+    pages = max(1, ctx.total // PAGE_SIZE)
+    page = ctx.rng.randrange(pages // 2 + 1, pages + 1) if pages > 1 else 1
+    return await ctx.client.get("/api/tpe/", params={"page": page, "page_size": PAGE_SIZE}, headers=ctx.headers)
+
+
+async def scenario_list_deep_cursor(ctx: Context, worker: int) -> httpx.Response:
+    # Chaque client parcourt le parc page après page (tri par nom de service)
+    params = {"pagination": "cursor", "sort": "service_name", "total": "none", "page_size": PAGE_SIZE}
+    cursor = ctx.cursors.get(worker)
+    if cursor:
+        params["cursor"] = cursor
+    response = await ctx.client.get("/api/tpe/", params=params, headers=ctx.headers)
+    if response.status_code == 200:
+        ctx.cursors[worker] = response.json()["next_cursor"]
+    return response
+
+
+async def scenario_stats(ctx: Context, worker: int) -> httpx.Response:
+    return await ctx.client.get("/api/tpe/stats/summary", headers=ctx.headers)
+
+
+async def scenario_detail(ctx: Context, worker: int) -> httpx.Response:
+    return await ctx.client.get(f"/api/tpe/{ctx.rng.choice(ctx.ids)}", headers=ctx.headers)
+
+
+async def scenario_create(ctx: Context, worker: int) -> httpx.Response:
+    payload = generate_tpe(ctx.rng, f"BENCH-R{ctx.run_id}-{next(ctx.created)}")
+    return await ctx.client.post("/api/tpe/", json=payload, headers=ctx.headers)
+
+
+async def scenario_update(ctx: Context, worker: int) -> httpx.Response:
+    payload = {"regisseur_telephone": f"0{ctx.rng.randrange(10 ** 8, 10 ** 9)}"}
+    return await ctx.client.put(f"/api/tpe/{ctx.rng.choice(ctx.ids)}", json=payload, headers=ctx.headers)
+
+
+async def scenario_export(ctx: Context, worker: int) -> httpx.Response:
+    # Corps lu entièrement : mesure la génération complète du fichier
+    return await ctx.client.get("/api/tpe/export/excel", headers=ctx.headers)
+
+
+# Nom -> (scénario, nombre maximal de requêtes, clients simultanés maximum)
+SCENARIOS: Dict[str, tuple] = {
+    "login": (scenario_login, None, None),
+    "list_first_page": (scenario_list_first_page, None, None),
+    "list_summary": (scenario_list_summary, None, None),
+    "list_search": (scenario_list_search, None, None),
+    "list_filter": (scenario_list_filter, None, None),
+    "list_deep_offset": (scenario_list_deep_offset, None, None),
+    "list_deep_cursor": (scenario_list_deep_cursor, None, None),
+    "stats": (scenario_stats, None, None),
+    "detail": (scenario_detail, None, None),
+    "create": (scenario_create, None, None),
+    "update": (scenario_update, None, None),
+    "export": (scenario_export, 5, 2),
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentile au rang le plus proche"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    """Jouer un scénario avec N clients simultanés"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = itertools.count()
+
+    async def client(worker: int):
+        while next(remaining) < requests:
+            start = time.perf_counter()
+            try:
+                response = await scenario(ctx, worker)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(worker) for worker in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    milliseconds = lambda value: round(value * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": milliseconds(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "p50_ms": milliseconds(percentile(latencies, 0.50)),
+        "p95_ms": milliseconds(percentile(latencies, 0.95)),
+        "p99_ms": milliseconds(percentile(latencies, 0.99)),
+        "max_ms": milliseconds(latencies[-1]) if latencies else 0.0,
+    }
+
+
+def _peak_rss_mb(server_pid: Optional[int]) -> Optional[float]:
+    """Pic de mémoire résidente : serveur (/proc) ou processus courant"""
+    if server_pid:
+        try:
+            with open(f"/proc/{server_pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return None
+        return None
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{'Scénario':<18} {'req':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, values in result["scenarios"].items():
+        print(
+            f"{name:<18} {values['requests']:>6} {values['errors']:>5} {values['throughput_rps']:>9.1f} "
+            f"{values['p50_ms']:>9.1f} {values['p95_ms']:>9.1f} {values['p99_ms']:>9.1f}"
+        )
+    if result["peak_rss_mb"] is not None:
+        print(f"\nPic RSS ({result['rss_source']}) : {result['peak_rss_mb']} Mo")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """Régressions de p95 ou de débit au-delà du seuil relatif"""
+    regressions = []
+    print(f"\nComparaison avec {baseline.get('label') or baseline.get('git_commit')} (seuil {threshold:.0%})")
+    for name, values in result["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if not reference:
+            continue
+        p95_change = (values["p95_ms"] - reference["p95_ms"]) / reference["p95_ms"] if reference["p95_ms"] else 0.0
+        rps_change = (
+            (values["throughput_rps"] - reference["throughput_rps"]) / reference["throughput_rps"]
+            if reference["throughput_rps"] else 0.0
+        )
+        regressed = p95_change > threshold or rps_change < -threshold
+        print(f"  {'❌' if regressed else '✓'} {name:<18} p95 {p95_change:+.0%}  débit {rps_change:+.0%}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+async def run(args) -> dict:
+    if args.url:
+        transport = None
+        base_url = args.url.rstrip("/")
+        lifespan = None
+    else:
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        base_url = "http://benchmark"
+        lifespan = main.lifespan(main.app)
+
+    if lifespan is not None:
+        await lifespan.__aenter__()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+            ctx = Context(args, client)
+            await ctx.prepare()
+            print(f"Parc : {ctx.total} TPE, {len(ctx.ids)} ids échantillonnés")
+
+            results = {}
+            for name in args.scenarios:
+                scenario, max_requests, max_concurrency = SCENARIOS[name]
+                requests = min(args.requests, max_requests) if max_requests else args.requests
+                concurrency = min(args.concurrency, max_concurrency) if max_concurrency else args.concurrency
+                print(f"→ {name} ({requests} requêtes, {concurrency} clients)")
+                results[name] = await run_scenario(ctx, scenario, requests, concurrency)
+    finally:
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "http" if args.url else "in-process",
+        "fleet_size": ctx.total,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "scenarios": results,
+        "peak_rss_mb": _peak_rss_mb(args.server_pid),
+        "rss_source": "server" if args.server_pid else ("api" if not args.url else "client"),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de l'API TPE Manager")
+    parser.add_argument("--url", help="API à solliciter (par défaut : application chargée en processus)")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés par scénario")
+    parser.add_argument("--requests", type=int, default=400, help="Requêtes par scénario")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Scénarios séparés par des virgules ({', '.join(SCENARIOS)})"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Graine des tirages (ids, termes de recherche)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Délai maximal d'une requête (s)")
+    parser.add_argument("--server-pid", type=int, help="PID du serveur pour relever son pic RSS (Linux)")
+    parser.add_argument("--label", help="Nom du résultat (ex. v1.4.0)")
+    parser.add_argument("--output", help="Fichier JSON où enregistrer le résultat")
+    parser.add_argument("--compare", help="Résultat de référence (JSON) à comparer")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Régression tolérée (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    print("=== TPE Manager - Benchmarks ===\n")
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2, ensure_ascii=False)
+        print(f"\n✓ Résultat enregistré dans {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(result, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Script pour peupler la base avec un parc synthétique de TPE (benchmarks)
+Usage: python benchmarks/seed_fleet.py --size 100000 [--seed 42] [--reset]
+
+Les TPE sont générés de façon déterministe (même graine, même parc) et
+insérés par le chemin de l'import en masse : compteurs statistiques,
+document de recherche, table des cartes commerçants et versions du cache
+restent cohérents. Leur ShopID commence par BENCH- ; --reset supprime ces
+TPE (et eux seuls) avant l'insertion.
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SHOP_ID_PREFIX = "BENCH-"
+
+SERVICES = [
+    "Piscine municipale", "Médiathèque", "Conservatoire de musique", "Cantine scolaire",
+    "Régie stationnement", "Musée des beaux-arts", "Office de tourisme", "Patinoire",
+    "Centre aquatique", "Théâtre municipal", "Crèche collective", "Accueil périscolaire",
+    "Cimetière", "Marché couvert", "Camping municipal", "Salle des fêtes",
+    "Golf municipal", "Port de plaisance", "Fourrière", "État civil",
+]
+DISTRICTS = [
+    "Centre", "Nord", "Sud", "Est", "Ouest", "Gare", "Port", "Saint-Jean",
+    "Les Prés", "Bellevue", "Montplaisir", "Vieux Bourg",
+]
+FIRST_NAMES = [
+    "Marie", "Jean", "Sophie", "Pierre", "Camille", "Nicolas", "Julie", "Thomas",
+    "Élodie", "François", "Chloé", "Antoine", "Hélène", "Mathieu", "Léa", "Stéphane",
+]
+LAST_NAMES = [
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+    "Leroy", "Moreau", "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "Fournier",
+]
+DESK_MODEL = "Ingenico Desk 5000"
+MOVE_MODEL = "Ingenico Move 5000"
+
+# Nombre de cartes commerçants : la plupart des régies en ont une ou deux
+CARD_COUNT_WEIGHTS = [(0, 10), (1, 45), (2, 25), (3, 10), (4, 5), (5, 2), (6, 1), (7, 1), (8, 1)]
+
+
+def _card_count(rng: random.Random) -> int:
+    counts, weights = zip(*CARD_COUNT_WEIGHTS)
+    return rng.choices(counts, weights=weights)[0]
+
+
+def generate_tpe(rng: random.Random, shop_id: str) -> dict:
+    """Données TPECreate réalistes (ShopID imposé)"""
+    model = DESK_MODEL if rng.random() < 0.6 else MOVE_MODEL
+    # Les Desk sont filaires, les Move en 4G/5G (quelques exceptions)
+    ethernet = model == DESK_MODEL and rng.random() < 0.9
+    mobile = model == MOVE_MODEL or rng.random() < 0.1
+    terminals = rng.choices([1, 2, 3, 4, 6], weights=[60, 20, 10, 6, 4])[0]
+
+    cards = []
+    for _ in range(_card_count(rng)):
+        cards.append({
+            "numero": str(rng.randrange(10 ** 7, 10 ** 8)),
+            "numero_serie_tpe": f"{'DSK' if model == DESK_MODEL else 'MOV'}{rng.randrange(10 ** 8, 10 ** 9)}",
+        })
+
+    substitutes = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.randrange(0, 3))]
+    backoffice = rng.random() < 0.3
+    subnet = rng.randrange(0, 255)
+
+    return {
+        "service_name": f"{rng.choice(SERVICES)} {rng.choice(DISTRICTS)} {rng.randrange(1, 100)}",
+        "shop_id": shop_id,
+        "regisseur_prenom": rng.choice(FIRST_NAMES),
+        "regisseur_nom": rng.choice(LAST_NAMES),
+        "regisseur_telephone": f"0{rng.randrange(1, 6)}{rng.randrange(10 ** 7, 10 ** 8)}",
+        "regisseurs_suppleants": ", ".join(substitutes) or None,
+        "merchant_cards": cards,
+        "tpe_model": model,
+        "number_of_tpe": terminals,
+        "connection_ethernet": ethernet,
+        "connection_4g5g": mobile,
+        "network_ip_address": f"10.{subnet}.{rng.randrange(0, 255)}.{rng.randrange(2, 254)}" if ethernet else None,
+        "network_mask": "255.255.255.0" if ethernet else None,
+        "network_gateway": f"10.{subnet}.0.1" if ethernet else None,
+        "backoffice_active": backoffice,
+        "backoffice_email": f"regie{rng.randrange(1, 10 ** 6)}@mairie.example.org" if backoffice else None,
+    }
+
+
+def _import_row(values: dict) -> dict:
+    """Ligne au format de l'import (en-têtes de l'export Excel)"""
+    import importer
+
+    fields = {field: header for header, field in importer.HEADER_FIELDS.items()}
+    row = {}
+    for field, value in values.items():
+        if field == "merchant_cards":
+            value = "; ".join(f"{card['numero']} ({card['numero_serie_tpe']})" for card in value)
+        elif isinstance(value, bool):
+            value = "Oui" if value else "Non"
+        row[fields[field]] = value
+    return row
+
+
+def iter_fleet(size: int, seed: int):
+    """Lignes d'import du parc synthétique, numérotées comme dans un fichier"""
+    rng = random.Random(seed)
+    for index in range(size):
+        yield index + 2, _import_row(generate_tpe(rng, f"{SHOP_ID_PREFIX}{index:07d}"))
+
+
+def reset_fleet(db) -> int:
+    """Supprimer les TPE synthétiques (par lots, compteurs et caches à jour)"""
+    import crud
+    import models
+
+    deleted = 0
+    while True:
+        ids = [
+            tpe_id for (tpe_id,) in
+            db.query(models.TPE.id)
+            .filter(models.TPE.shop_id.like(f"{SHOP_ID_PREFIX}%"))
+            .order_by(models.TPE.id)
+            .limit(crud.BULK_CHUNK_SIZE)
+        ]
+        if not ids:
+            return deleted
+        deleted += crud.bulk_delete_tpes(db, ids=ids)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parc synthétique de TPE pour les benchmarks")
+    parser.add_argument("--size", type=int, default=10000, help="Nombre de TPE (ex. 10000 à 1000000)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur (parc reproductible)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Taille des lots d'insertion")
+    parser.add_argument("--reset", action="store_true", help="Supprimer d'abord les TPE BENCH- existants")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+    import importer
+
+    print("=== TPE Manager - Parc synthétique ===\n")
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            print(f"✓ {reset_fleet(db)} TPE synthétiques supprimés")
+
+        start = time.perf_counter()
+        report = importer.import_tpes(db, iter_fleet(args.size, args.seed), batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        print(f"✓ {report['imported']} TPE insérés en {elapsed:.1f} s ({report['imported'] / elapsed:.0f}/s)")
+        if report["failed"]:
+            print(f"❌ {report['failed']} lignes rejetées (premier motif : {report['errors'][0]['errors']})")
+            print("   Parc déjà présent ? Relancer avec --reset")
+            return 1
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Cache des réponses de lecture
+
+Les lectures fréquentes (liste, détail et statistiques des TPE, liste des
+utilisateurs) sont mises en cache sous une clé dérivée des paramètres
+normalisés et de la version de leurs étiquettes (``tpes``, ``users``).
+
+Les versions des étiquettes sont stockées en base (table ``cache_tags``) et
+incrémentées par les fonctions d'écriture de ``crud``, dans la transaction
+de l'écriture : après un commit, aucun worker ne relit une entrée antérieure,
+quel que soit le stockage. Les entrées périmées ne sont jamais relues et
+disparaissent par LRU ou expiration.
+
+Stockages disponibles (``CACHE_BACKEND``) :
+
+- ``memory`` : LRU + TTL propre à chaque processus (substitut local des tests) ;
+- ``redis`` : partagé entre workers, nécessite le paquet ``redis`` ;
+- ``none`` : cache désactivé.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import get_settings
+import models
+
+TPES_TAG = "tpes"
+USERS_TAG = "users"
+
+_MISSING = object()
+
+
+def invalidate(db: Session, *tags: str) -> Dict[str, int]:
+    """Incrémenter la version des étiquettes dans la transaction courante (nouvelles versions)"""
+    versions = {}
+    for tag in tags:
+        # La ligne reste verrouillée jusqu'au commit : les versions d'une
+        # étiquette sont attribuées dans l'ordre des commits
+        version = db.execute(
+            update(models.CacheTag)
+            .where(models.CacheTag.tag == tag)
+            .values(version=models.CacheTag.version + 1)
+            .returning(models.CacheTag.version)
+        ).scalar()
+        if version is None:
+            version = 1
+            db.add(models.CacheTag(tag=tag, version=version))
+        versions[tag] = version
+    return versions
+
+
+def tag_versions(db: Session, tags: Iterable[str]) -> Dict[str, int]:
+    """Versions courantes des étiquettes (0 si jamais invalidées)"""
+    tags = list(tags)
+    rows = db.query(models.CacheTag.tag, models.CacheTag.version).filter(models.CacheTag.tag.in_(tags))
+    versions = dict(rows.all())
+    return {tag: versions.get(tag, 0) for tag in tags}
+
+
+class MemoryBackend:
+    """LRU + TTL en mémoire, propre au processus"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Stockage Redis (ou compatible) partagé entre les workers"""
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: int, prefix: str = "tpe-manager:cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        data = await self._client.get(self.prefix + key)
+        if data is None:
+            return _MISSING
+        return json.loads(data)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self._client.set(self.prefix + key, json.dumps(value, separators=(",", ":")), ex=self.ttl)
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class ResponseCache:
+    """Cache de réponses sérialisées, invalidé par étiquettes"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict[str, Any], versions: Dict[str, int]) -> str:
+        """Clé stable : espace, versions des étiquettes et paramètres normalisés"""
+        normalized = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        tags = ",".join(f"{tag}={version}" for tag, version in sorted(versions.items()))
+        return f"{namespace}:{tags}:{digest}"
+
+    async def get_or_load(
+        self,
+        db: AsyncSession,
+        namespace: str,
+        params: Dict[str, Any],
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Lire la réponse en cache ou la calculer (valeur JSON, None non mise en cache)"""
+        if self.backend is None:
+            return await loader()
+
+        versions = await db.run_sync(tag_versions, tags)
+        key = self.make_key(namespace, params, versions)
+
+        # Une panne du stockage ne doit pas faire échouer la lecture
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            value = _MISSING
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            try:
+                await self.backend.set(key, value)
+            except Exception:
+                self.errors += 1
+        return value
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "entries": self.backend.size() if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+
+def create_backend(settings=None):
+    """Stockage choisi par CACHE_BACKEND"""
+    settings = settings or get_settings()
+    if settings.CACHE_BACKEND == "none":
+        return None
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL, ttl=settings.CACHE_TTL_SECONDS)
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(create_backend())
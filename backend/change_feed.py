@@ -0,0 +1,54 @@
+"""
+Flux de modifications des TPE (synchronisation incrémentale)
+
+Chaque transaction d'écriture reçoit une version de la table ``tpes`` :
+celle de l'étiquette de cache ``tpes``, incrémentée dans la transaction et
+verrouillée jusqu'à son commit. Les versions sont donc attribuées dans
+l'ordre des commits, contrairement à ``updated_at`` (heure de début de la
+transaction) : un client qui a lu jusqu'à la version N ne verra jamais
+apparaître plus tard une écriture de version inférieure ou égale.
+
+Les lignes écrites portent cette version (``tpes.change_version``) ; une
+suppression laisse une trace dans ``tpe_tombstones`` avec la sienne. Le
+jeton du flux encode la dernière position lue (version, id).
+"""
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import BigInteger, insert, literal, select
+from sqlalchemy.orm import Session
+
+import cache
+import models
+import pagination
+
+_TOKEN_KEY = "changes"
+
+
+def next_version(db: Session) -> int:
+    """Version de la table pour la transaction courante (invalide aussi le cache des TPE)"""
+    return cache.invalidate(db, cache.TPES_TAG)[cache.TPES_TAG]
+
+
+def record_deletes(db: Session, tpe_ids: Iterable[int], version: int) -> None:
+    """Tracer les TPE sur le point d'être supprimés (avant le DELETE)"""
+    tpe = models.TPE
+    db.execute(
+        insert(models.TPETombstone).from_select(
+            ["tpe_id", "shop_id", "change_version"],
+            select(tpe.id, tpe.shop_id, literal(version, BigInteger)).where(tpe.id.in_(list(tpe_ids)))
+        )
+    )
+
+
+def encode_token(version: int, last_id: int) -> str:
+    return pagination.encode_cursor(_TOKEN_KEY, "asc", version, last_id)
+
+
+def decode_token(token: Optional[str]) -> Tuple[int, int]:
+    """Position (version, id) d'un jeton ; début du flux sans jeton"""
+    if not token:
+        return 0, 0
+    version, last_id = pagination.decode_cursor(token, _TOKEN_KEY, "asc")
+    if not isinstance(version, int):
+        raise pagination.InvalidCursor("Invalid change token")
+    return version, last_id
@@ -0,0 +1,116 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified)
+
+Les lectures des TPE calculent leurs validateurs avant toute requête sur les
+lignes : version de la table ``tpes`` pour la liste et les statistiques,
+``updated_at`` pour un TPE. Si le client présente le même ETag
+(``If-None-Match``) ou une date ``If-Modified-Since`` suffisante, la réponse
+est un 304 sans corps, sans lecture des lignes ni sérialisation.
+
+Les ETag sont faibles (``W/``) : nginx compresse les réponses JSON et
+supprimerait des ETag forts. Les fichiers d'export, immuables, ont un ETag
+fort qui conditionne la reprise des téléchargements (``Range`` / ``If-Range``).
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+# Réponses propres à l'utilisateur authentifié, à revalider à chaque usage
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag faible dérivé des éléments qui déterminent la représentation"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite renvoie des dates naïves, enregistrées en UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _opaque(etag: str) -> str:
+    """Partie opaque d'un ETag (comparaison faible)"""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class Validators:
+    """Validateurs HTTP d'une représentation"""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        self.last_modified = _utc(last_modified) if last_modified else None
+
+    def matches(self, request: Request) -> bool:
+        """Vrai si la copie du client est à jour (If-None-Match prioritaire)"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in candidates or _opaque(self.etag) in map(_opaque, candidates)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = _utc(parsedate_to_datetime(if_modified_since))
+            except (TypeError, ValueError):
+                return False
+            # Les dates HTTP sont à la seconde près
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def apply(self, response: Response) -> None:
+        """Ajouter les validateurs à la réponse complète"""
+        response.headers.update(self.headers())
+
+    def not_modified(self) -> Response:
+        """Réponse 304 sans corps"""
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers())
+
+
+class RangeNotSatisfiable(Exception):
+    """Plage demandée hors du fichier (416)"""
+
+
+def byte_range(request: Request, size: int, etag: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """Plage d'octets demandée (bornes incluses), None pour le fichier entier"""
+    header = request.headers.get("range", "")
+    if not header.startswith("bytes="):
+        return None
+
+    # If-Range : la plage ne vaut que pour la même version du fichier
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        # Plages multiples : le fichier entier est une réponse valide
+        return None
+    first, _, last = spec.partition("-")
+    try:
+        if not first:
+            # Suffixe : les N derniers octets
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
@@ -10,14 +10,82 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = "5432"
     POSTGRES_DB: str = "tpe_manager"
     
+    # Pools de connexions, par moteur (sync et async) et par worker : au plus
+    # workers x 2 x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connexions.
+    # DB_POOL_MODE=null : une connexion par checkout, rendue aussitôt (NullPool),
+    # le regroupement étant laissé à PgBouncer. DB_POOL_RECYCLE < 0 : jamais.
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    
+    # PgBouncer en mode transaction : aucune instruction préparée nommée
+    # réutilisée d'une transaction à l'autre (asyncpg)
+    DB_PGBOUNCER: bool = False
+    
     # JWT
     SECRET_KEY: str = "change_this_secret_key_in_production_min_32_chars"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Cache des utilisateurs authentifiés ; AUTH_TRUST_TOKEN_CLAIMS autorise
+    # sans base à partir des claims du token (désactivation effective à expiration)
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 1024
+    # Délai maximal avant qu'une écriture d'un autre worker vide ce cache
+    USER_CACHE_VERSION_CHECK_SECONDS: float = 1.0
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+    
+    # Hachage des mots de passe (pool borné) et limitation des échecs de connexion
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    LOGIN_MAX_FAILURES: int = 5
+    # Échecs tous utilisateurs confondus depuis une même adresse client
+    LOGIN_MAX_FAILURES_PER_CLIENT: int = 20
+    LOGIN_FAILURE_WINDOW_SECONDS: int = 300
+    
+    # Cache des réponses de lecture : memory (par processus), redis ou none
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_REDIS_URL: str = "redis://redis:6379/0"
+    
+    # Listes et détails des TPE sérialisés sans revalidation (voir serializers.py)
+    FAST_SERIALIZATION: bool = True
+    
     # Application
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
+    # Profilage SQL par requête (en-têtes X-Debug-*, /_debug) : coûteux,
+    # activé explicitement, indépendamment de DEBUG
+    SQL_PROFILER: bool = False
+    
+    # Suggestions (index en mémoire, reconstruit périodiquement ; 0 = jamais)
+    SUGGEST_REFRESH_SECONDS: int = 300
+    
+    # Export
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Exports en tâche de fond : fichiers dans EXPORT_DIR (relatif à backend/),
+    # pool borné par worker, résultats conservés EXPORT_RETENTION_SECONDS
+    EXPORT_DIR: str = "exports"
+    EXPORT_JOB_WORKERS: int = 2
+    EXPORT_JOB_MAX_PENDING: int = 8
+    EXPORT_RETENTION_SECONDS: int = 86400
+    
+    # Événements poussés (GET /api/tpe/events) : memory (abonnés du worker)
+    # ou postgres (LISTEN/NOTIFY, diffusion à tous les workers)
+    EVENTS_BACKEND: str = "memory"
+    # Connexion LISTEN (postgres) ; derrière PgBouncer en mode transaction,
+    # indiquer une URL directe vers PostgreSQL (vide : base de l'application)
+    EVENTS_DATABASE_URL: str = ""
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_QUEUE_SIZE: int = 100
+    
+    # Import en masse
+    IMPORT_BATCH_SIZE: int = 1000
     
     # CORS
     CORS_ORIGINS: str = "http://localhost,http://localhost:3000,http://localhost:80"
@@ -26,6 +94,10 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def async_database_url(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+    
     @property
     def cors_origins_list(self) -> list:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
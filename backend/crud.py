@@ -1,9 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy import and_, delete, false, func, select, true, tuple_, union_all, update
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
 import models
 import schemas
-from auth import get_password_hash
+import stats
+import pagination
+import search as search_index
+import suggest
+import merchant_cards
+import cache
+import change_feed
+from auth import get_password_hash, user_cache
 
 
 # User CRUD operations
@@ -22,9 +30,14 @@ def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]
     return db.query(models.User).offset(skip).limit(limit).all()
 
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    """Créer un nouvel utilisateur"""
-    hashed_password = get_password_hash(user.password)
+def create_user(
+    db: Session,
+    user: schemas.UserCreate,
+    hashed_password: Optional[str] = None
+) -> models.User:
+    """Créer un nouvel utilisateur (hachage fourni ou calculé ici)"""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -32,13 +45,19 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
         role=user.role
     )
     db.add(db_user)
+    cache.invalidate(db, cache.USERS_TAG)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> Optional[models.User]:
-    """Mettre à jour un utilisateur"""
+def update_user(
+    db: Session,
+    user_id: int,
+    user_update: schemas.UserUpdate,
+    hashed_password: Optional[str] = None
+) -> Optional[models.User]:
+    """Mettre à jour un utilisateur (hachage fourni ou calculé ici)"""
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         return None
@@ -47,13 +66,17 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> O
     
     # Hash le nouveau mot de passe si fourni
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        password = update_data.pop("password")
+        update_data["hashed_password"] = hashed_password or get_password_hash(password)
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
+    cache.invalidate(db, cache.USERS_TAG)
     db.commit()
     db.refresh(db_user)
+    # Rôle ou activation modifiés : effet immédiat sur l'authentification
+    user_cache.invalidate(db_user.username)
     return db_user
 
 
@@ -64,7 +87,9 @@ def delete_user(db: Session, user_id: int) -> bool:
         return False
     
     db.delete(db_user)
+    cache.invalidate(db, cache.USERS_TAG)
     db.commit()
+    user_cache.invalidate(db_user.username)
     return True
 
 
@@ -74,30 +99,33 @@ def get_tpe(db: Session, tpe_id: int) -> Optional[models.TPE]:
     return db.query(models.TPE).filter(models.TPE.id == tpe_id).first()
 
 
+def get_tpe_last_modified(db: Session, tpe_id: int) -> Optional[datetime]:
+    """Date de dernière modification d'un TPE, sans charger la ligne (None si absent)"""
+    row = (
+        db.query(models.TPE.updated_at, models.TPE.created_at)
+        .filter(models.TPE.id == tpe_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return row.updated_at or row.created_at
+
+
 def get_tpe_by_shop_id(db: Session, shop_id: str) -> Optional[models.TPE]:
     """Récupérer un TPE par ShopID"""
     return db.query(models.TPE).filter(models.TPE.shop_id == shop_id).first()
 
 
-def get_tpes(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def _filter_tpes(
+    query,
     search: Optional[str] = None,
     tpe_model: Optional[str] = None,
     connection_type: Optional[str] = None
-) -> tuple[List[models.TPE], int]:
-    """Récupérer les TPE avec filtres et pagination"""
-    query = db.query(models.TPE)
-    
-    # Filtre de recherche (service_name ou shop_id)
+):
+    """Appliquer les filtres de liste des TPE à une requête"""
+    # Filtre de recherche (service, ShopID, régisseur, cartes commerçants)
     if search:
-        query = query.filter(
-            or_(
-                models.TPE.service_name.ilike(f"%{search}%"),
-                models.TPE.shop_id.ilike(f"%{search}%")
-            )
-        )
+        query = search_index.filter_query(query, search)
     
     # Filtre par modèle
     if tpe_model:
@@ -109,15 +137,230 @@ def get_tpes(
     elif connection_type == "4g5g":
         query = query.filter(models.TPE.connection_4g5g == True)
     
+    return query
+
+
+def _project(query, columns: Sequence[str]):
+    """Ne lire que ces colonnes (et l'id) : lignes sans objets ORM"""
+    names = dict.fromkeys(["id", *columns])
+    return query.with_entities(*(getattr(models.TPE, name) for name in names))
+
+
+def get_tpes(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    tpe_model: Optional[str] = None,
+    connection_type: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None
+) -> tuple[List[models.TPE], int]:
+    """Récupérer les TPE avec filtres et pagination (columns : lignes réduites à ces colonnes)"""
+    query = _filter_tpes(db.query(models.TPE), search, tpe_model, connection_type)
+    
     # Compter le total
     total = query.count()
     
+    if columns:
+        query = _project(query, columns)
+    
+    # Classer par pertinence en cas de recherche
+    if search:
+        query = query.order_by(*search_index.rank_order(db, search))
+    
     # Appliquer la pagination
     tpes = query.offset(skip).limit(limit).all()
     
     return tpes, total
 
 
+def estimate_count(db: Session, query) -> Optional[int]:
+    """Nombre de lignes estimé par le planificateur PostgreSQL (sans exécuter)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = compiled.params
+    # Pilote positionnel (asyncpg : $1, $2...) : valeurs dans l'ordre des marqueurs
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", params
+    ).scalar()
+    return pagination.parse_estimate(plan)
+
+
+def get_tpes_keyset(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    search: Optional[str] = None,
+    tpe_model: Optional[str] = None,
+    connection_type: Optional[str] = None,
+    total_mode: str = "none",
+    columns: Optional[Sequence[str]] = None
+) -> tuple[List[models.TPE], Optional[str], Optional[int]]:
+    """Récupérer une page de TPE par curseur (keyset), sans OFFSET"""
+    if sort not in pagination.SORT_KEYS:
+        raise pagination.InvalidCursor(f"Unsupported sort key: {sort}")
+    
+    sort_column = getattr(models.TPE, sort)
+    unique_key = sort in pagination.UNIQUE_SORT_KEYS
+    query = _filter_tpes(db.query(models.TPE), search, tpe_model, connection_type)
+    
+    # Total optionnel : exact (COUNT), estimé (planificateur) ou absent
+    total = None
+    if total_mode == "exact":
+        total = query.count()
+    elif total_mode == "estimate":
+        total = estimate_count(db, query)
+    
+    # Reprendre après la dernière position vue : WHERE (k, id) > (v, last_id)
+    if cursor:
+        value, last_id = pagination.decode_cursor(cursor, sort, order)
+        if unique_key:
+            position, after = sort_column, value
+        else:
+            position, after = tuple_(sort_column, models.TPE.id), tuple_(value, last_id)
+        query = query.filter(position > after if order == "asc" else position < after)
+    
+    if columns:
+        # La clé de tri sert à construire le curseur suivant
+        query = _project(query, [*columns, sort])
+    
+    if order == "asc":
+        ordering = [sort_column.asc()] if unique_key else [sort_column.asc(), models.TPE.id.asc()]
+    else:
+        ordering = [sort_column.desc()] if unique_key else [sort_column.desc(), models.TPE.id.desc()]
+    
+    # Lire une ligne de plus pour savoir s'il existe une page suivante
+    tpes = query.order_by(*ordering).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(tpes) > limit:
+        tpes = tpes[:limit]
+        last = tpes[-1]
+        next_cursor = pagination.encode_cursor(sort, order, getattr(last, sort), last.id)
+    
+    return tpes, next_cursor, total
+
+
+def get_tpe_changes(
+    db: Session,
+    since: Optional[str] = None,
+    limit: int = 500
+) -> Tuple[List[models.TPE], List[models.TPETombstone], str, bool]:
+    """TPE écrits et supprimés depuis un jeton, dans l'ordre des versions"""
+    version, last_id = change_feed.decode_token(since)
+    
+    # Les deux flux sont lus en une seule instruction, donc sur un même
+    # instantané : deux requêtes successives pourraient manquer une
+    # modification validée entre elles tout en avançant le jeton au-delà.
+    # Même reprise que la pagination par curseur, sur (version, id)
+    tpe = models.TPE
+    tombstone = models.TPETombstone
+    # Chaque flux est limité sur son index (version, id) avant la fusion
+    tpe_changes = (
+        select(
+            tpe.change_version.label("change_version"),
+            tpe.id.label("tpe_id"),
+            tpe.id.label("row_id"),
+            false().label("deleted"),
+        )
+        .where(tuple_(tpe.change_version, tpe.id) > tuple_(version, last_id))
+        .order_by(tpe.change_version, tpe.id)
+        .limit(limit + 1)
+        .subquery()
+    )
+    tombstone_changes = (
+        select(
+            tombstone.change_version.label("change_version"),
+            tombstone.tpe_id.label("tpe_id"),
+            tombstone.id.label("row_id"),
+            true().label("deleted"),
+        )
+        .where(tuple_(tombstone.change_version, tombstone.tpe_id) > tuple_(version, last_id))
+        .order_by(tombstone.change_version, tombstone.tpe_id)
+        .limit(limit + 1)
+        .subquery()
+    )
+    changes = union_all(select(tpe_changes), select(tombstone_changes)).subquery()
+    entries = db.execute(
+        select(changes)
+        .order_by(changes.c.change_version, changes.c.tpe_id, changes.c.deleted)
+        .limit(limit + 1)
+    ).all()
+    
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if entries:
+        version, last_id = entries[-1].change_version, entries[-1].tpe_id
+    
+    # Contenu chargé ensuite : un TPE modifié depuis est renvoyé dans son état
+    # courant (et de nouveau plus tard), un TPE supprimé depuis est omis (sa
+    # trace, de version plus récente, suivra)
+    tpe_ids = [entry.row_id for entry in entries if not entry.deleted]
+    tombstone_ids = [entry.row_id for entry in entries if entry.deleted]
+    tpes = {row.id: row for row in db.query(tpe).filter(tpe.id.in_(tpe_ids))} if tpe_ids else {}
+    tombstones = (
+        {row.id: row for row in db.query(tombstone).filter(tombstone.id.in_(tombstone_ids))}
+        if tombstone_ids else {}
+    )
+    
+    items = [tpes[row_id] for row_id in tpe_ids if row_id in tpes]
+    deleted = [tombstones[row_id] for row_id in tombstone_ids]
+    return items, deleted, change_feed.encode_token(version, last_id), has_more
+
+
+def get_tpes_by_card_serial(db: Session, numero_serie_tpe: str) -> List[models.TPE]:
+    """TPE portant une carte avec ce numéro de série (lecture d'index)"""
+    return (
+        db.query(models.TPE)
+        .join(models.MerchantCard, models.MerchantCard.tpe_id == models.TPE.id)
+        .filter(models.MerchantCard.numero_serie_tpe == numero_serie_tpe)
+        .distinct()
+        .all()
+    )
+
+
+def get_tpes_by_card_number(db: Session, numero: str) -> List[models.TPE]:
+    """TPE auxquels ce numéro de carte commerçant est attribué (lecture d'index)"""
+    return (
+        db.query(models.TPE)
+        .join(models.MerchantCard, models.MerchantCard.tpe_id == models.TPE.id)
+        .filter(models.MerchantCard.numero == numero)
+        .distinct()
+        .all()
+    )
+
+
+def count_tpes(
+    db: Session,
+    search: Optional[str] = None,
+    tpe_model: Optional[str] = None,
+    connection_type: Optional[str] = None
+) -> int:
+    """Nombre de TPE correspondant aux filtres de liste"""
+    return _filter_tpes(db.query(models.TPE), search, tpe_model, connection_type).count()
+
+
+def iter_tpes(
+    db: Session,
+    batch_size: int = 1000,
+    search: Optional[str] = None,
+    tpe_model: Optional[str] = None,
+    connection_type: Optional[str] = None
+) -> Iterator[models.TPE]:
+    """Parcourir les TPE (filtres de liste optionnels) par lots via un curseur côté serveur"""
+    query = _filter_tpes(db.query(models.TPE), search, tpe_model, connection_type)
+    for tpe in query.order_by(models.TPE.id).yield_per(batch_size):
+        yield tpe
+
+
 def create_tpe(db: Session, tpe: schemas.TPECreate) -> models.TPE:
     """Créer un nouveau TPE"""
     # Convertir les merchant_cards en dict pour JSON
@@ -139,16 +382,22 @@ def create_tpe(db: Session, tpe: schemas.TPECreate) -> models.TPE:
         network_mask=tpe.network_mask,
         network_gateway=tpe.network_gateway,
         backoffice_active=tpe.backoffice_active,
-        backoffice_email=tpe.backoffice_email
+        backoffice_email=tpe.backoffice_email,
+        change_version=change_feed.next_version(db)
     )
     
     # Générer un ShopID si non fourni
     if not db_tpe.shop_id:
         db_tpe.generate_shop_id()
     
+    db_tpe.search_text = search_index.build_document(db_tpe)
     db.add(db_tpe)
+    db.flush()
+    merchant_cards.insert_cards(db, [(db_tpe.id, db_tpe.merchant_cards)])
+    stats.apply_delta(db, stats.contribution(db_tpe))
     db.commit()
     db.refresh(db_tpe)
+    suggest.index.upsert(db_tpe.id, db_tpe.service_name, db_tpe.shop_id)
     return db_tpe
 
 
@@ -164,11 +413,20 @@ def update_tpe(db: Session, tpe_id: int, tpe_update: schemas.TPEUpdate) -> Optio
     if "merchant_cards" in update_data and update_data["merchant_cards"]:
         update_data["merchant_cards"] = [card.dict() for card in tpe_update.merchant_cards]
     
+    before = stats.contribution(db_tpe)
     for field, value in update_data.items():
         setattr(db_tpe, field, value)
+    db_tpe.search_text = search_index.build_document(db_tpe)
+    if "merchant_cards" in update_data:
+        merchant_cards.replace_cards(db, db_tpe.id, db_tpe.merchant_cards)
     
+    # Verrous dans le même ordre que les autres écritures : cache_tags, puis tpe_stats
+    db_tpe.change_version = change_feed.next_version(db)
+    # Ajuster uniquement les compteurs touchés par les champs modifiés
+    stats.apply_delta(db, stats.diff(before, stats.contribution(db_tpe)))
     db.commit()
     db.refresh(db_tpe)
+    suggest.index.upsert(db_tpe.id, db_tpe.service_name, db_tpe.shop_id)
     return db_tpe
 
 
@@ -178,25 +436,96 @@ def delete_tpe(db: Session, tpe_id: int) -> bool:
     if not db_tpe:
         return False
     
+    delta = stats.negate(stats.contribution(db_tpe))
+    change_feed.record_deletes(db, [tpe_id], change_feed.next_version(db))
+    merchant_cards.delete_cards(db, [tpe_id])
     db.delete(db_tpe)
+    db.flush()
+    stats.apply_delta(db, delta)
     db.commit()
+    suggest.index.remove(tpe_id)
     return True
 
 
+# Taille des lots d'ids pour les opérations ensemblistes (limite les paramètres)
+BULK_CHUNK_SIZE = 5000
+
+
+def _bulk_target_ids(
+    db: Session,
+    ids: Optional[List[int]] = None,
+    search: Optional[str] = None,
+    tpe_model: Optional[str] = None,
+    connection_type: Optional[str] = None
+) -> List[int]:
+    """Ids visés par une opération en masse, verrouillés jusqu'au commit"""
+    query = _filter_tpes(db.query(models.TPE.id), search, tpe_model, connection_type)
+    if ids is not None:
+        query = query.filter(models.TPE.id.in_(ids))
+    return [tpe_id for (tpe_id,) in query.order_by(models.TPE.id).with_for_update()]
+
+
+def _chunks(ids: List[int]) -> Iterator[List[int]]:
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        yield ids[start:start + BULK_CHUNK_SIZE]
+
+
+def bulk_update_tpes(db: Session, changes: dict, **selector) -> int:
+    """Appliquer les mêmes modifications à plusieurs TPE en une transaction"""
+    target_ids = _bulk_target_ids(db, **selector)
+    if not target_ids or not changes:
+        return 0
+    
+    values = dict(changes, updated_at=func.now(), change_version=change_feed.next_version(db))
+    deltas = []
+    for chunk in _chunks(target_ids):
+        in_chunk = models.TPE.id.in_(chunk)
+        before = stats.compute_stats(db, in_chunk)
+        db.execute(
+            update(models.TPE)
+            .where(in_chunk)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        deltas.append(stats.diff(before, stats.compute_stats(db, in_chunk)))
+    
+    # Compteurs ajustés une seule fois pour toute l'opération
+    stats.apply_delta(db, stats.add(*deltas))
+    db.commit()
+    return len(target_ids)
+
+
+def bulk_delete_tpes(db: Session, **selector) -> int:
+    """Supprimer plusieurs TPE en une transaction"""
+    target_ids = _bulk_target_ids(db, **selector)
+    if not target_ids:
+        return 0
+    
+    version = change_feed.next_version(db)
+    deltas = []
+    for chunk in _chunks(target_ids):
+        in_chunk = models.TPE.id.in_(chunk)
+        deltas.append(stats.negate(stats.compute_stats(db, in_chunk)))
+        change_feed.record_deletes(db, chunk, version)
+        merchant_cards.delete_cards(db, chunk)
+        db.execute(
+            delete(models.TPE)
+            .where(in_chunk)
+            .execution_options(synchronize_session=False)
+        )
+    
+    stats.apply_delta(db, stats.add(*deltas))
+    db.commit()
+    for tpe_id in target_ids:
+        suggest.index.remove(tpe_id)
+    return len(target_ids)
+
+
+def get_tpe_version(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Version de la table tpes et date de la dernière écriture"""
+    return stats.read_version(db)
+
+
 def get_tpe_stats(db: Session) -> dict:
-    """Obtenir les statistiques des TPE"""
-    total = db.query(models.TPE).count()
-    desk_count = db.query(models.TPE).filter(models.TPE.tpe_model == "Ingenico Desk 5000").count()
-    move_count = db.query(models.TPE).filter(models.TPE.tpe_model == "Ingenico Move 5000").count()
-    ethernet_count = db.query(models.TPE).filter(models.TPE.connection_ethernet == True).count()
-    mobile_count = db.query(models.TPE).filter(models.TPE.connection_4g5g == True).count()
-    backoffice_active_count = db.query(models.TPE).filter(models.TPE.backoffice_active == True).count()
-    
-    return {
-        "total": total,
-        "desk_count": desk_count,
-        "move_count": move_count,
-        "ethernet_count": ethernet_count,
-        "mobile_count": mobile_count,
-        "backoffice_active_count": backoffice_active_count
-    }
+    """Obtenir les statistiques des TPE (lecture des compteurs maintenus)"""
+    return stats.read_counters(db)
@@ -1,19 +1,72 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
+import instrumentation
+import uuid
 
 settings = get_settings()
 
+
+def _pool_options(name: str, queue_pool) -> dict:
+    """Options de pool d'un moteur (DB_POOL_MODE, DB_POOL_*)"""
+    if settings.DB_POOL_MODE == "null":
+        # Connexion neuve à chaque checkout : rien à vérifier ni à recycler
+        return {"poolclass": instrumentation.TimedNullPool, "pool_logging_name": name}
+    return {
+        "poolclass": queue_pool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+
+
+def _async_connect_args() -> dict:
+    """Arguments asyncpg (DB_PGBOUNCER : aucune instruction préparée réutilisée)"""
+    # En mode transaction, la connexion serveur peut servir un autre client
+    # dès la fin de la transaction : une instruction préparée n'y survit pas
+    if not settings.DB_PGBOUNCER:
+        return {}
+    return {
+        # Ni cache d'instructions préparées (asyncpg et SQLAlchemy)...
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        # ...ni noms séquentiels, qui entrent en collision d'un client à l'autre
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    **_pool_options("sync", instrumentation.TimedQueuePool)
 )
+instrumentation.instrument_engine(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur asynchrone (asyncpg) utilisé par les routes : les requêtes ne
+# bloquent plus la boucle d'événements. Le moteur synchrone reste utilisé
+# par les exports en flux, le démarrage et les scripts.
+async_engine = create_async_engine(
+    settings.async_database_url,
+    connect_args=_async_connect_args(),
+    **_pool_options("async", instrumentation.TimedAsyncQueuePool)
+)
+instrumentation.instrument_engine(async_engine.sync_engine, "async")
+
+# expire_on_commit=False : les objets restent lisibles après commit sans
+# rechargement implicite (impossible hors de la boucle asynchrone)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -26,6 +79,8 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """Initialiser la base de données"""
-    Base.metadata.create_all(bind=engine)
+async def get_async_db():
+    """Dependency pour obtenir une session asynchrone"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
@@ -0,0 +1,204 @@
+"""
+Événements des TPE poussés en direct (Server-Sent Events)
+
+Les routes d'écriture publient, après commit, un événement compact par
+opération ; ``GET /api/tpe/events`` le transmet aux clients abonnés qui
+mettent alors leur vue à jour au lieu de la recharger périodiquement.
+
+- ``tpe.created`` / ``tpe.updated`` : id et colonnes du tableau de la liste
+  (``serializers.SUMMARY_FIELDS``) ;
+- ``tpe.deleted`` : id ;
+- ``tpe.bulk_updated`` / ``tpe.bulk_deleted`` / ``tpe.imported`` : nombre de
+  TPE concernés (recharger la vue) ;
+- ``resync`` : des événements ont été perdus (client trop lent, connexion
+  LISTEN rétablie) : recharger la vue, ou rattraper via ``/api/tpe/changes``.
+
+Diffusion (``EVENTS_BACKEND``) :
+
+- ``memory`` : abonnés du worker qui a traité l'écriture uniquement ;
+- ``postgres`` : ``NOTIFY`` sur le canal ``tpe_events``, chaque worker
+  écoute (``LISTEN``) sur une connexion asyncpg dédiée et relaie à ses
+  abonnés : tous les clients reçoivent les écritures de tous les workers.
+"""
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+import serializers
+from config import get_settings
+
+CHANNEL = "tpe_events"
+
+_RESYNC = {"type": "resync"}
+
+
+def tpe_event(kind: str, tpe) -> dict:
+    """Événement d'un TPE créé ou modifié"""
+    return {
+        "type": f"tpe.{kind}",
+        "id": tpe.id,
+        "tpe": serializers.tpe_to_dict(tpe, serializers.SUMMARY_FIELDS),
+    }
+
+
+def deleted_event(tpe_id: int) -> dict:
+    return {"type": "tpe.deleted", "id": tpe_id}
+
+
+def bulk_event(kind: str, count: int) -> dict:
+    """Événement d'une opération en masse (la vue est rechargée)"""
+    return {"type": f"tpe.{kind}", "count": count}
+
+
+def format_event(event: dict) -> bytes:
+    """Message SSE : nom de l'événement et données JSON"""
+    return b"event: " + event["type"].encode("ascii") + b"\ndata: " + serializers.dumps(event) + b"\n\n"
+
+
+class PostgresBackend:
+    """LISTEN/NOTIFY sur une connexion asyncpg propre au worker"""
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, deliver):
+        try:
+            import asyncpg
+        except ImportError as e:
+            raise RuntimeError("EVENTS_BACKEND=postgres requires the 'asyncpg' package") from e
+        self._asyncpg = asyncpg
+        self._dsn = dsn
+        self._deliver = deliver
+        self._connection = None
+        self._reconnect_task = None
+        self._closing = False
+        # Une connexion asyncpg n'exécute qu'une requête à la fois
+        self._lock = asyncio.Lock()
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._deliver(json.loads(payload))
+
+    def _on_terminate(self, connection) -> None:
+        if not self._closing:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _connect(self) -> None:
+        connection = await self._asyncpg.connect(self._dsn)
+        await connection.add_listener(CHANNEL, self._on_notify)
+        connection.add_termination_listener(self._on_terminate)
+        self._connection = connection
+
+    async def _reconnect(self, delay: float = 1.0) -> None:
+        """Rétablir l'écoute ; les notifications de la coupure sont perdues"""
+        self._connection = None
+        while not self._closing:
+            try:
+                await self._connect()
+            except Exception as e:
+                print(f"Event listener reconnect failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            self._deliver(_RESYNC)
+            return
+
+    async def start(self) -> None:
+        await self._connect()
+
+    async def publish(self, event: dict) -> None:
+        if self._connection is None:
+            raise RuntimeError("Event listener not connected")
+        payload = serializers.dumps(event).decode("utf-8")
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+
+
+class EventBroker:
+    """Abonnés du worker (une file bornée par connexion SSE)"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.backend = None
+        self._subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def deliver(self, event: Optional[dict]) -> None:
+        """Remettre un événement aux abonnés de ce worker (None : fin du flux)"""
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client trop lent : sa file est remplacée par un seul resync
+                self.dropped += queue.qsize()
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC if event is not None else None)
+
+    async def publish(self, event: dict) -> None:
+        """Diffuser un événement ; une erreur de diffusion n'échoue pas l'écriture"""
+        self.published += 1
+        if self.backend is None:
+            self.deliver(event)
+            return
+        try:
+            await self.backend.publish(event)
+        except Exception as e:
+            print(f"Event publish failed: {e}")
+            self.deliver(event)
+
+    async def start(self, settings=None) -> None:
+        settings = settings or get_settings()
+        if settings.EVENTS_BACKEND == "postgres":
+            self.backend = PostgresBackend(settings.EVENTS_DATABASE_URL or settings.database_url, self.deliver)
+            await self.backend.start()
+
+    async def close(self) -> None:
+        # Terminer les flux en cours : l'arrêt du worker n'attend pas les clients
+        self.deliver(None)
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+
+    async def stream(self, heartbeat: float) -> AsyncIterator[bytes]:
+        """Flux SSE d'un client, avec un commentaire périodique contre les coupures des proxys"""
+        # La déconnexion du client annule ce générateur (StreamingResponse)
+        queue = self.subscribe()
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield format_event(event)
+        finally:
+            self.unsubscribe(queue)
+
+    def metrics(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else "memory",
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+broker = EventBroker(queue_size=get_settings().EVENTS_QUEUE_SIZE)
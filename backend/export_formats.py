@@ -0,0 +1,181 @@
+"""
+Formats d'export, tous écrits en flux à partir du pipeline de ``export_rows``
+
+- ``xlsx`` : classeur Excel (xlsx_stream), libellés Oui/Non ;
+- ``csv`` : UTF-8 avec BOM, séparateur « ; », mêmes colonnes que l'Excel
+  (réimportable par ``POST /api/tpe/import``) ;
+- ``ndjson`` : un objet JSON typé par ligne, compressé gzip au fil de l'eau ;
+- ``parquet`` : colonnes typées par groupes de lignes (pyarrow, optionnel).
+
+Chaque générateur produit des morceaux d'octets au fur et à mesure : ni les
+lignes ni le fichier complet ne sont gardés en mémoire.
+"""
+import csv
+import io
+import itertools
+import zlib
+from collections import namedtuple
+from typing import Iterable, Iterator, List, Sequence
+
+import serializers
+from export_rows import COLUMNS, HEADERS, Column, labelled
+from xlsx_stream import stream_xlsx, XLSX_MEDIA_TYPE
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    pyarrow = None
+
+# Lignes par groupe Parquet (unité de lecture des outils colonnes)
+PARQUET_ROW_GROUP_SIZE = 10000
+
+
+def _drain_text(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    return data
+
+
+def stream_csv(
+    headers: Sequence[str],
+    rows: Iterable[Sequence],
+    delimiter: str = ";",
+    flush_every: int = 1000
+) -> Iterator[bytes]:
+    """Générer un fichier CSV morceau par morceau"""
+    buffer = io.StringIO()
+    # BOM : Excel ouvre alors le fichier en UTF-8
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\r\n")
+    writer.writerow(headers)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % flush_every == 0:
+            yield _drain_text(buffer)
+
+    yield _drain_text(buffer)
+
+
+def stream_ndjson_gz(columns: Sequence[Column], rows: Iterable[List], flush_every: int = 1000) -> Iterator[bytes]:
+    """Générer un fichier NDJSON compressé (gzip) morceau par morceau"""
+    fields = [column.field for column in columns]
+    datetimes = [index for index, column in enumerate(columns) if column.kind == "datetime"]
+    # wbits 31 : flux deflate avec en-tête et somme de contrôle gzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    lines = []
+    for row in rows:
+        for index in datetimes:
+            row[index] = serializers.isoformat(row[index])
+        lines.append(serializers.dumps(dict(zip(fields, row))))
+        if len(lines) >= flush_every:
+            chunk = compressor.compress(b"\n".join(lines) + b"\n")
+            lines.clear()
+            if chunk:
+                yield chunk
+
+    if lines:
+        yield compressor.compress(b"\n".join(lines) + b"\n")
+    yield compressor.flush()
+
+
+class _ParquetSink:
+    """Sortie non positionnable pour pyarrow (position tenue, vidée par groupe)"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(columns: Sequence[Column]):
+    types = {
+        "int": pyarrow.int64(),
+        "str": pyarrow.string(),
+        "bool": pyarrow.bool_(),
+        "datetime": pyarrow.timestamp("us", tz="UTC"),
+    }
+    return pyarrow.schema([(column.field, types[column.kind]) for column in columns])
+
+
+def stream_parquet(
+    columns: Sequence[Column],
+    rows: Iterable[List],
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE
+) -> Iterator[bytes]:
+    """Générer un fichier Parquet, un groupe de lignes à la fois"""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+
+    schema = _arrow_schema(columns)
+    sink = _ParquetSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    rows = iter(rows)
+    try:
+        while True:
+            group = list(itertools.islice(rows, row_group_size))
+            if not group:
+                break
+            arrays = [
+                pyarrow.array([row[index] for row in group], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ExportFormat = namedtuple("ExportFormat", ["extension", "media_type", "stream"])
+
+FORMATS = {
+    "xlsx": ExportFormat(
+        "xlsx", XLSX_MEDIA_TYPE,
+        lambda rows: stream_xlsx(HEADERS, labelled(rows), sheet_title="TPE List")
+    ),
+    "csv": ExportFormat(
+        "csv", "text/csv",
+        lambda rows: stream_csv(HEADERS, labelled(rows))
+    ),
+    "ndjson": ExportFormat(
+        "ndjson.gz", "application/gzip",
+        lambda rows: stream_ndjson_gz(COLUMNS, rows)
+    ),
+    "parquet": ExportFormat(
+        "parquet", "application/vnd.apache.parquet",
+        lambda rows: stream_parquet(COLUMNS, rows)
+    ),
+}
+
+
+def available(export_format: str) -> bool:
+    """Format connu et utilisable (parquet : pyarrow installé)"""
+    if export_format == "parquet":
+        return pyarrow is not None
+    return export_format in FORMATS
@@ -0,0 +1,211 @@
+"""
+Exports en tâche de fond
+
+``POST /api/tpe/exports`` place l'export dans un pool de threads borné (par
+worker) au lieu de l'exécuter pendant la requête. Le fichier est écrit dans
+``EXPORT_DIR`` ; l'état du job (progression, taille, erreur) est un fichier
+JSON voisin, lisible par tous les workers qui partagent ce répertoire.
+
+L'identifiant d'un job est dérivé du format, des filtres et de la version de
+la table ``tpes`` : une demande identique tant que les données n'ont pas
+changé renvoie le job existant (en cours ou terminé) et son fichier, sans
+nouvel export. Les fichiers plus anciens que ``EXPORT_RETENTION_SECONDS``
+sont supprimés au fil des nouvelles demandes.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+import crud
+import export_rows
+from config import get_settings
+from database import SessionLocal
+from export_formats import FORMATS
+from instrumentation import timed_export
+
+settings = get_settings()
+
+_JOB_ID = re.compile(r"^[0-9a-f]{20}$")
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ExportQueueFull(Exception):
+    """Trop d'exports en attente dans ce worker"""
+
+
+def job_id(export_format: str, filters: Dict[str, Optional[str]], version: int) -> str:
+    """Identifiant stable : même format, mêmes filtres, même version des données"""
+    key = json.dumps([export_format, filters, version], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ExportJobs:
+    """Pool borné d'exports et état des jobs sur disque"""
+
+    def __init__(self, directory: str, max_workers: int, max_pending: int, retention: int):
+        self.directory = os.path.join(_BACKEND_DIR, directory)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+        # Jobs soumis par ce worker (en attente ou en cours)
+        self._active = set()
+
+    def _status_path(self, job: str) -> str:
+        return os.path.join(self.directory, f"{job}.json")
+
+    def result_path(self, job: dict) -> str:
+        return os.path.join(self.directory, f"{job['id']}.{FORMATS[job['format']].extension}")
+
+    def _write(self, job: dict) -> None:
+        # Remplacement atomique : un autre worker ne lit jamais un état partiel
+        path = self._status_path(job["id"])
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as output:
+            json.dump(job, output)
+        os.replace(temporary, path)
+
+    def _alive(self, job: dict) -> bool:
+        """Le worker qui exécute ce job est-il toujours là ?"""
+        if job["pid"] == os.getpid():
+            with self._lock:
+                return job["id"] in self._active
+        try:
+            os.kill(job["pid"], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def get(self, job: str) -> Optional[dict]:
+        """État d'un job (None si inconnu ou expiré)"""
+        if not _JOB_ID.match(job):
+            return None
+        try:
+            with open(self._status_path(job)) as status:
+                state = json.load(status)
+        except (OSError, ValueError):
+            return None
+        if state["state"] in ("queued", "running") and not self._alive(state):
+            state.update(state="failed", error="Export interrupted (worker stopped)")
+        if state["state"] == "done" and not os.path.exists(self.result_path(state)):
+            return None
+        return state
+
+    def submit(self, export_format: str, filters: Dict[str, Optional[str]], version: int) -> dict:
+        """Job existant pour ces filtres et cette version, sinon nouveau job"""
+        job = self.get(job_id(export_format, filters, version))
+        if job and job["state"] != "failed":
+            return job
+
+        job = {
+            "id": job_id(export_format, filters, version),
+            "format": export_format,
+            "filter": filters,
+            "state": "queued",
+            "rows_done": 0,
+            "rows_total": None,
+            "size": None,
+            "error": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "pid": os.getpid(),
+        }
+        with self._lock:
+            # Même export demandé en parallèle dans ce worker : un seul _run,
+            # sinon deux écritures du même fichier partiel
+            if job["id"] in self._active:
+                return self.get(job["id"]) or job
+            if len(self._active) >= self.max_pending:
+                raise ExportQueueFull("Too many exports in progress")
+            self._active.add(job["id"])
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(job)
+        self.cleanup()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _rows(self, db, job: dict) -> Iterator[list]:
+        """Lignes de l'export, progression enregistrée à chaque lot"""
+        batch_size = settings.EXPORT_BATCH_SIZE
+        for row in export_rows.iter_rows(db, batch_size=batch_size, filters=job["filter"]):
+            yield row
+            job["rows_done"] += 1
+            if job["rows_done"] % batch_size == 0:
+                self._write(job)
+
+    def _run(self, job: dict) -> None:
+        # Fichier partiel propre au worker : deux workers qui exportent les
+        # mêmes données produisent le même fichier, le dernier renommage gagne
+        target = self.result_path(job)
+        partial = f"{target}.{os.getpid()}.part"
+        db = SessionLocal()
+        try:
+            job.update(state="running", started_at=_now(), rows_total=crud.count_tpes(db, **job["filter"]))
+            self._write(job)
+
+            chunks = FORMATS[job["format"]].stream(self._rows(db, job))
+            with open(partial, "wb") as output:
+                for chunk in timed_export(chunks, job["format"]):
+                    output.write(chunk)
+            os.replace(partial, target)
+            job.update(state="done", size=os.path.getsize(target), finished_at=_now())
+        except Exception as e:
+            print(f"Export job {job['id']} failed: {e}")
+            job.update(state="failed", error=str(e), finished_at=_now())
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            db.close()
+            self._write(job)
+            with self._lock:
+                self._active.discard(job["id"])
+
+    def cleanup(self) -> int:
+        """Supprimer les fichiers expirés (hors jobs en cours de ce worker)"""
+        deadline = time.time() - self.retention
+        with self._lock:
+            active = set(self._active)
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(".") or name.split(".")[0] in active:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < deadline:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            active = len(self._active)
+        return {"workers": self.max_workers, "max_pending": self.max_pending, "active": active}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+jobs = ExportJobs(
+    directory=settings.EXPORT_DIR,
+    max_workers=settings.EXPORT_JOB_WORKERS,
+    max_pending=settings.EXPORT_JOB_MAX_PENDING,
+    retention=settings.EXPORT_RETENTION_SECONDS
+)
@@ -0,0 +1,104 @@
+"""
+Pipeline de lignes des exports
+
+Les TPE sont lus par lots (curseur côté serveur, filtres de la liste) et
+aplatis une seule fois en lignes typées, dans l'ordre de ``COLUMNS`` :
+booléens, entiers, dates et cartes commerçants jointes en
+« numéro (série); ... » (format relu par l'import). Chaque format consomme
+ce même flux ; les formats tabulaires pour humains (XLSX, CSV) y ajoutent
+l'étape ``labelled`` (Oui/Non, dates lisibles, cellules vides).
+
+Tout est générateur : une ligne n'est produite que lorsque le format la
+demande, la mémoire reste constante quel que soit le parc.
+"""
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+import crud
+
+# kind : int, str, bool ou datetime (types des formats typés)
+Column = namedtuple("Column", ["field", "header", "kind"])
+
+COLUMNS = [
+    Column("id", "ID", "int"),
+    Column("service_name", "Service Name", "str"),
+    Column("shop_id", "ShopID", "str"),
+    Column("regisseur_prenom", "Régisseur Prénom", "str"),
+    Column("regisseur_nom", "Régisseur Nom", "str"),
+    Column("regisseur_telephone", "Régisseur Téléphone", "str"),
+    Column("regisseurs_suppleants", "Régisseurs Suppléants", "str"),
+    Column("merchant_cards", "Cartes commerçants", "str"),
+    Column("tpe_model", "Modèle TPE", "str"),
+    Column("number_of_tpe", "Nombre de TPE", "int"),
+    Column("connection_ethernet", "Connexion Ethernet", "bool"),
+    Column("connection_4g5g", "Connexion 4G/5G", "bool"),
+    Column("network_ip_address", "IP Address", "str"),
+    Column("network_mask", "Mask", "str"),
+    Column("network_gateway", "Gateway", "str"),
+    Column("backoffice_active", "Backoffice Actif", "bool"),
+    Column("backoffice_email", "Backoffice Email", "str"),
+    Column("created_at", "Date de création", "datetime"),
+]
+
+HEADERS = [column.header for column in COLUMNS]
+FIELDS = [column.field for column in COLUMNS]
+
+_BOOLEAN_INDEXES = [index for index, column in enumerate(COLUMNS) if column.kind == "bool"]
+_DATETIME_INDEXES = [index for index, column in enumerate(COLUMNS) if column.kind == "datetime"]
+
+
+def join_cards(cards: Optional[List[dict]]) -> Optional[str]:
+    """Cartes commerçants en une cellule : « 123 (ABC); 456 (DEF) »"""
+    if not cards:
+        return None
+    return "; ".join(
+        f"{card.get('numero') or ''} ({card.get('numero_serie_tpe') or ''})" for card in cards
+    )
+
+
+def flatten(tpe) -> List[Any]:
+    """Ligne typée d'un TPE, dans l'ordre de COLUMNS"""
+    return [
+        tpe.id,
+        tpe.service_name,
+        tpe.shop_id,
+        tpe.regisseur_prenom,
+        tpe.regisseur_nom,
+        tpe.regisseur_telephone,
+        tpe.regisseurs_suppleants,
+        join_cards(tpe.merchant_cards),
+        tpe.tpe_model,
+        tpe.number_of_tpe,
+        bool(tpe.connection_ethernet),
+        bool(tpe.connection_4g5g),
+        tpe.network_ip_address,
+        tpe.network_mask,
+        tpe.network_gateway,
+        bool(tpe.backoffice_active),
+        tpe.backoffice_email,
+        tpe.created_at,
+    ]
+
+
+def iter_rows(db: Session, batch_size: int = 1000, filters: Optional[Dict[str, Optional[str]]] = None) -> Iterator[List[Any]]:
+    """Lignes typées des TPE correspondant aux filtres de liste"""
+    for tpe in crud.iter_tpes(db, batch_size=batch_size, **(filters or {})):
+        yield flatten(tpe)
+
+
+def _label_date(value: Optional[datetime]) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else ""
+
+
+def labelled(rows: Iterable[List[Any]]) -> Iterator[List[Any]]:
+    """Étape des formats tabulaires : Oui/Non, dates lisibles, vides pour None"""
+    for row in rows:
+        row = ["" if value is None else value for value in row]
+        for index in _BOOLEAN_INDEXES:
+            row[index] = "Oui" if row[index] else "Non"
+        for index in _DATETIME_INDEXES:
+            row[index] = _label_date(row[index] or None)
+        yield row
@@ -0,0 +1,89 @@
+"""
+Pool borné pour le hachage des mots de passe
+
+bcrypt coûte 100 à 300 ms de CPU par appel : exécuté dans la boucle
+d'événements, il bloque toutes les autres requêtes du worker. Les appels sont
+confiés à un pool de threads de taille fixe (bcrypt libère le GIL) ; au-delà
+de ``max_pending`` appels en attente, les nouveaux sont refusés immédiatement
+(``HashingPoolBusy``) plutôt que d'allonger la file.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from config import get_settings
+
+settings = get_settings()
+
+
+class HashingPoolBusy(Exception):
+    """File du pool de hachage pleine"""
+
+
+class HashingPool:
+    """Exécution bornée des fonctions de hachage, avec métriques de file"""
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+    
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Exécuter une fonction dans le pool (HashingPoolBusy si saturé)"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HashingPoolBusy("Password hashing queue is full")
+            self._pending += 1
+        
+        submitted = time.perf_counter()
+        
+        def task():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return function(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+        
+        try:
+            return await asyncio.wrap_future(self._executor.submit(task))
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    def metrics(self) -> dict:
+        """Profondeur de file et temps d'attente"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_avg_ms": round(self._wait_total / self._completed * 1000, 2) if self._completed else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+            }
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = HashingPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
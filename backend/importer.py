@@ -0,0 +1,279 @@
+"""
+Import en masse de TPE (CSV ou XLSX)
+
+Le fichier suit la disposition de l'export Excel (mêmes en-têtes, booléens
+« Oui »/« Non »). Les lignes sont lues en flux, validées avec
+``schemas.TPECreate`` puis insérées par lots : une requête ensembliste vérifie
+l'unicité des ShopID du lot et un seul INSERT multi-lignes l'écrit. Les
+lignes invalides sont ignorées et rapportées avec leur numéro.
+"""
+import csv
+import io
+import re
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import change_feed
+import merchant_cards
+import models
+import schemas
+import search
+import stats
+import suggest
+
+# En-têtes de l'export Excel -> champs de TPECreate (ID et date ignorés)
+HEADER_FIELDS = {
+    "Service Name": "service_name",
+    "ShopID": "shop_id",
+    "Régisseur Prénom": "regisseur_prenom",
+    "Régisseur Nom": "regisseur_nom",
+    "Régisseur Téléphone": "regisseur_telephone",
+    "Régisseurs Suppléants": "regisseurs_suppleants",
+    "Cartes commerçants": "merchant_cards",
+    "Modèle TPE": "tpe_model",
+    "Nombre de TPE": "number_of_tpe",
+    "Connexion Ethernet": "connection_ethernet",
+    "Connexion 4G/5G": "connection_4g5g",
+    "IP Address": "network_ip_address",
+    "Mask": "network_mask",
+    "Gateway": "network_gateway",
+    "Backoffice Actif": "backoffice_active",
+    "Backoffice Email": "backoffice_email",
+}
+
+BOOLEAN_FIELDS = {"connection_ethernet", "connection_4g5g", "backoffice_active"}
+TRUE_VALUES = {"oui", "yes", "true", "vrai", "1", "x"}
+FALSE_VALUES = {"non", "no", "false", "faux", "0"}
+
+CSV_DELIMITERS = (";", ",", "\t")
+
+# « 123 (ABC) » : numéro de carte et numéro de série du TPE
+CARD_PATTERN = re.compile(r"^\s*(?P<numero>[^()]+?)\s*\((?P<serie>[^()]*)\)\s*$")
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible ou en-têtes inconnus"""
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def _boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = (_text(value) or "").lower()
+    if not text or text in FALSE_VALUES:
+        return False
+    if text in TRUE_VALUES:
+        return True
+    raise ValueError(f"invalid boolean value '{value}'")
+
+
+def _merchant_cards(value: Any) -> List[dict]:
+    text = _text(value)
+    if not text:
+        return []
+    cards = []
+    for part in text.split(";"):
+        if not part.strip():
+            continue
+        match = CARD_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"invalid merchant card '{part.strip()}'")
+        cards.append({"numero": match["numero"], "numero_serie_tpe": match["serie"].strip()})
+    return cards
+
+
+def _parse_value(field: str, value: Any) -> Any:
+    if field in BOOLEAN_FIELDS:
+        return _boolean(value)
+    if field == "merchant_cards":
+        return _merchant_cards(value)
+    return _text(value)
+
+
+def parse_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertir une ligne brute (en-tête -> cellule) en données TPECreate"""
+    data = {}
+    for header, value in raw.items():
+        field = HEADER_FIELDS.get(header)
+        if field is None:
+            continue
+        try:
+            parsed = _parse_value(field, value)
+        except ValueError as e:
+            raise ValueError(f"{field}: {e}")
+        # Cellule vide : valeur par défaut du schéma (ex. number_of_tpe = 1)
+        if parsed is not None:
+            data[field] = parsed
+    return data
+
+
+def _columns(headers: List[Any]) -> List[Optional[str]]:
+    columns = [_text(header) for header in headers]
+    if "Service Name" not in columns:
+        raise ImportFormatError("Missing 'Service Name' column")
+    return columns
+
+
+def _iter_csv(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    header_line = text.readline()
+    text.seek(0)
+    # Séparateur le plus fréquent de la ligne d'en-tête (« ; » pour Excel FR)
+    delimiter = max(CSV_DELIMITERS, key=header_line.count)
+    
+    reader = csv.reader(text, delimiter=delimiter)
+    try:
+        columns = _columns(next(reader))
+    except StopIteration:
+        raise ImportFormatError("Empty file")
+    for values in reader:
+        yield dict(zip(columns, values))
+
+
+def _iter_xlsx(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError("Invalid XLSX file")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            columns = _columns(list(next(rows)))
+        except StopIteration:
+            raise ImportFormatError("Empty file")
+        for values in rows:
+            yield dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(file: BinaryIO, filename: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Lire les lignes d'un fichier CSV ou XLSX (numéro de ligne, valeurs)"""
+    if filename.lower().endswith(".xlsx"):
+        rows = _iter_xlsx(file)
+    elif filename.lower().endswith(".csv"):
+        rows = _iter_csv(file)
+    else:
+        raise ImportFormatError("Unsupported file type (expected .csv or .xlsx)")
+    
+    # La ligne 1 est l'en-tête
+    for row_number, raw in enumerate(rows, start=2):
+        if any(_text(value) for value in raw.values()):
+            yield row_number, raw
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+def _insert_batch(db: Session, batch: List[Tuple[int, dict]], report: dict, dry_run: bool) -> None:
+    """Vérifier l'unicité des ShopID du lot puis l'insérer en une fois"""
+    shop_ids = [values["shop_id"] for _, values in batch]
+    existing = {
+        shop_id for (shop_id,) in
+        db.query(models.TPE.shop_id).filter(models.TPE.shop_id.in_(shop_ids))
+    }
+    
+    rows = []
+    for row_number, values in batch:
+        if values["shop_id"] in existing:
+            report["errors"].append({
+                "row": row_number,
+                "shop_id": values["shop_id"],
+                "errors": ["shop_id: ShopID already exists"]
+            })
+            continue
+        rows.append(values)
+    
+    if not rows:
+        return
+    if dry_run:
+        report["imported"] += len(rows)
+        return
+    
+    delta = stats.add(*(stats.contribution(values) for values in rows))
+    version = change_feed.next_version(db)
+    
+    result = db.execute(
+        insert(models.TPE).returning(
+            models.TPE.id, models.TPE.service_name, models.TPE.shop_id, models.TPE.merchant_cards
+        ),
+        [dict(values, change_version=version) for values in rows]
+    )
+    inserted = result.all()
+    merchant_cards.insert_cards(db, [(row.id, row.merchant_cards) for row in inserted])
+    stats.apply_delta(db, delta)
+    db.commit()
+    
+    for row in inserted:
+        suggest.index.upsert(row.id, row.service_name, row.shop_id)
+    report["imported"] += len(inserted)
+
+
+def import_tpes(
+    db: Session,
+    rows: Iterator[Tuple[int, Dict[str, Any]]],
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> dict:
+    """Valider et insérer des lignes par lots ; rapport d'erreurs par ligne"""
+    report = {"total_rows": 0, "imported": 0, "dry_run": dry_run, "errors": []}
+    seen_shop_ids = set()
+    batch = []
+    
+    for row_number, raw in rows:
+        report["total_rows"] += 1
+        try:
+            tpe = schemas.TPECreate(**parse_row(raw))
+        except ValidationError as e:
+            report["errors"].append({
+                "row": row_number,
+                "shop_id": _text(raw.get("ShopID")),
+                "errors": _validation_messages(e)
+            })
+            continue
+        except ValueError as e:
+            report["errors"].append({"row": row_number, "shop_id": _text(raw.get("ShopID")), "errors": [str(e)]})
+            continue
+        
+        values = tpe.dict()
+        if not values["shop_id"]:
+            db_tpe = models.TPE()
+            db_tpe.generate_shop_id()
+            values["shop_id"] = db_tpe.shop_id
+        
+        # Doublon à l'intérieur du fichier
+        if values["shop_id"] in seen_shop_ids:
+            report["errors"].append({
+                "row": row_number,
+                "shop_id": values["shop_id"],
+                "errors": ["shop_id: duplicate ShopID in file"]
+            })
+            continue
+        seen_shop_ids.add(values["shop_id"])
+        
+        values["search_text"] = search.build_document(values)
+        batch.append((row_number, values))
+        
+        if len(batch) >= batch_size:
+            _insert_batch(db, batch, report, dry_run)
+            batch = []
+    
+    if batch:
+        _insert_batch(db, batch, report, dry_run)
+    
+    report["failed"] = len(report["errors"])
+    return report
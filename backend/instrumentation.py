@@ -0,0 +1,285 @@
+"""
+Instrumentation de l'API (exposée par ``GET /metrics``)
+
+- middleware ASGI : latence par route, requêtes en cours, nombre et durée
+  des requêtes SQL émises pendant chaque requête HTTP ;
+- événements SQLAlchemy : durée de chaque requête SQL, par moteur ;
+- pools de connexions : attente au checkout (classes de pool instrumentées),
+  saturation lue à la collecte, état détaillé dans ``/health`` ;
+- exports : durée de génération et volume produit.
+"""
+import contextvars
+import time
+from typing import Dict, Iterator
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+import metrics
+
+# Bornes des histogrammes longs (exports) et des nombres de requêtes SQL
+EXPORT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+REQUEST_LATENCY = metrics.histogram(
+    "tpe_http_request_duration_seconds",
+    "Durée des requêtes HTTP jusqu'au dernier octet de la réponse",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "tpe_http_requests_in_flight",
+    "Requêtes HTTP en cours de traitement",
+    ["method"],
+)
+REQUEST_DB_QUERIES = metrics.histogram(
+    "tpe_http_request_db_queries",
+    "Nombre de requêtes SQL par requête HTTP",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = metrics.histogram(
+    "tpe_http_request_db_seconds",
+    "Temps passé en requêtes SQL par requête HTTP",
+    ["route"],
+)
+QUERY_DURATION = metrics.histogram(
+    "tpe_db_query_duration_seconds",
+    "Durée des requêtes SQL",
+    ["engine"],
+)
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "tpe_db_pool_checkout_wait_seconds",
+    "Attente d'une connexion du pool (ouverture comprise)",
+    ["pool"],
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "tpe_db_pool_checkout_timeouts_total",
+    "Checkouts abandonnés faute de connexion disponible (pool_timeout)",
+    ["pool"],
+)
+EXPORT_DURATION = metrics.histogram(
+    "tpe_export_duration_seconds",
+    "Durée de génération des exports",
+    ["format"],
+    buckets=EXPORT_BUCKETS,
+)
+EXPORT_BYTES = metrics.counter(
+    "tpe_export_bytes_total",
+    "Volume produit par les exports",
+    ["format"],
+)
+
+# Moteurs suivis, par nom de pool
+_engines: Dict[str, Engine] = {}
+
+# Connexions empruntées par pool (un NullPool ne les compte pas lui-même)
+_checked_out: Dict[str, int] = {}
+
+
+def _pool_values(read) -> Dict[tuple, float]:
+    values = {}
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            value = read(pool)
+            if value is not None:
+                values[(name,)] = value
+    return values
+
+
+def _checked_out_values() -> Dict[tuple, float]:
+    return {(name,): _checked_out_count(name, engine.pool) for name, engine in list(_engines.items())}
+
+
+def _checked_out_count(name: str, pool) -> int:
+    if isinstance(pool, QueuePool):
+        return pool.checkedout()
+    return _checked_out.get(name, 0)
+
+
+def _capacity(pool: QueuePool):
+    # max_overflow négatif : pas de limite
+    if pool._max_overflow < 0:
+        return None
+    return pool.size() + pool._max_overflow
+
+
+def _saturation(pool: QueuePool):
+    capacity = _capacity(pool)
+    if not capacity:
+        return None
+    return round(pool.checkedout() / capacity, 4)
+
+
+metrics.gauge(
+    "tpe_db_pool_checked_out",
+    "Connexions actuellement empruntées au pool",
+    ["pool"],
+    callback=_checked_out_values,
+)
+metrics.gauge(
+    "tpe_db_pool_capacity",
+    "Connexions maximales du pool (pool_size + max_overflow)",
+    ["pool"],
+    callback=lambda: _pool_values(_capacity),
+)
+metrics.gauge(
+    "tpe_db_pool_saturation",
+    "Part de la capacité du pool empruntée (0 à 1)",
+    ["pool"],
+    callback=lambda: _pool_values(_saturation),
+)
+
+
+class _RequestQueries:
+    """Requêtes SQL émises pendant la requête HTTP courante"""
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_request: contextvars.ContextVar = contextvars.ContextVar("request_queries", default=None)
+
+
+class _TimedPoolMixin:
+    """Mesure l'attente de chaque checkout (le nom du pool est pool_logging_name)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        name = self.logging_name or "default"
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(pool=name)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, pool=name)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+def pool_stats() -> Dict[str, dict]:
+    """État des pools suivis (exposé par /health)"""
+    stats = {}
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        entry = {
+            "class": type(pool).__name__,
+            "checked_out": _checked_out_count(name, pool),
+            "pre_ping": pool._pre_ping,
+            "recycle": pool._recycle,
+        }
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+                capacity=_capacity(pool),
+                saturation=_saturation(pool),
+            )
+        stats[name] = entry
+    return stats
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Chronométrer les requêtes SQL d'un moteur et suivre son pool"""
+    _engines[name] = engine
+    _checked_out[name] = 0
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        _checked_out[name] += 1
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        _checked_out[name] -= 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        QUERY_DURATION.observe(elapsed, engine=name)
+        queries = _current_request.get()
+        if queries is not None:
+            queries.count += 1
+            queries.duration += elapsed
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence, requêtes en cours et SQL par route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        event_stream = False
+        queries = _RequestQueries()
+        token = _current_request.set(queries)
+
+        async def send_with_status(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    # Flux SSE (/api/tpe/events) ouvert pendant des heures : hors
+                    # requêtes en cours et latence (abonnés : /health, "events")
+                    event_stream = True
+                    REQUESTS_IN_FLIGHT.dec(method=method)
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            if not event_stream:
+                REQUESTS_IN_FLIGHT.dec(method=method)
+
+                # Gabarit de la route (/api/tpe/{tpe_id}) : cardinalité bornée
+                route = getattr(scope.get("route"), "path", "unmatched")
+                REQUEST_LATENCY.observe(elapsed, method=method, route=route, status=str(status_code))
+                REQUEST_DB_QUERIES.observe(queries.count, route=route)
+                REQUEST_DB_TIME.observe(queries.duration, route=route)
+
+
+def timed_export(chunks: Iterator[bytes], export_format: str) -> Iterator[bytes]:
+    """Mesurer la génération d'un export en flux, jusqu'au dernier morceau"""
+    start = time.perf_counter()
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        EXPORT_DURATION.observe(time.perf_counter() - start, format=export_format)
+        EXPORT_BYTES.inc(size, format=export_format)
@@ -1,65 +1,84 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
+import asyncio
 import time
 
 from config import get_settings
-from database import get_db, init_db
-import models
-import crud
-import schemas
+from database import get_async_db, SessionLocal, engine, async_engine
+import suggest
+import hashing
+import events
+import export_jobs
+import metrics
+import profiler
+from instrumentation import MetricsMiddleware, pool_stats
+from cache import response_cache
 from routers import auth as auth_router
 from routers import users as users_router
 from routers import tpe as tpe_router
-from auth import get_password_hash
+from routers import debug as debug_router
 
 settings = get_settings()
 
 
+def load_suggestions():
+    """(Re)construire l'index de suggestions depuis la base"""
+    db = SessionLocal()
+    try:
+        return suggest.load(db)
+    finally:
+        db.close()
+
+
+async def refresh_suggestions(interval: int):
+    """Reconstruire périodiquement l'index (écritures des autres workers)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(load_suggestions)
+        except Exception as e:
+            print(f"Suggestion index refresh failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager for startup and shutdown"""
     # Startup
     print("Starting up TPE Manager API...")
-    init_db()
+    # Le schéma (alembic upgrade head) et les comptes par défaut
+    # (scripts/seed_users.py) sont préparés une seule fois avant le démarrage :
+    # aucun DDL ni hachage ici, quel que soit le nombre de workers.
     
-    # Créer les utilisateurs par défaut
-    db = next(get_db())
-    try:
-        # Vérifier si l'admin existe
-        admin_user = crud.get_user_by_username(db, "admin")
-        if not admin_user:
-            admin_data = schemas.UserCreate(
-                username="admin",
-                email="admin@example.com",
-                password="admin123",
-                role="admin"
-            )
-            crud.create_user(db, admin_data)
-            print("✓ Admin user created (username: admin, password: admin123)")
-        
-        # Vérifier si l'utilisateur standard existe
-        regular_user = crud.get_user_by_username(db, "user")
-        if not regular_user:
-            user_data = schemas.UserCreate(
-                username="user",
-                email="user@example.com",
-                password="user123",
-                role="user"
-            )
-            crud.create_user(db, user_data)
-            print("✓ Regular user created (username: user, password: user123)")
-    finally:
-        db.close()
+    pgbouncer = " (PgBouncer)" if settings.DB_PGBOUNCER else ""
+    print(f"✓ Database pools: {settings.DB_POOL_MODE}{pgbouncer}")
+    
+    # Index de suggestions en mémoire
+    count = load_suggestions()
+    print(f"✓ Suggestion index loaded ({count} TPE)")
+    refresh_task = None
+    if settings.SUGGEST_REFRESH_SECONDS > 0:
+        refresh_task = asyncio.create_task(refresh_suggestions(settings.SUGGEST_REFRESH_SECONDS))
+    
+    # Diffusion des événements des TPE (LISTEN si EVENTS_BACKEND=postgres)
+    await events.broker.start()
+    print(f"✓ Event broker ready ({events.broker.metrics()['backend']})")
     
-    print("✓ Database initialized")
     print("✓ API ready")
     
     yield
     
     # Shutdown
     print("Shutting down TPE Manager API...")
+    if refresh_task:
+        refresh_task.cancel()
+    await events.broker.close()
+    await response_cache.close()
+    await async_engine.dispose()
+    hashing.pool.shutdown()
+    export_jobs.jobs.shutdown()
 
 
 # Créer l'application FastAPI
@@ -77,12 +96,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Debug-Request-Id", "X-Debug-SQL"] if settings.SQL_PROFILER else [],
 )
 
+# Profilage SQL par requête et détection N+1, uniquement si SQL_PROFILER :
+# sinon, ni middleware ni écouteurs SQLAlchemy ne sont installés
+if settings.SQL_PROFILER:
+    profiler.instrument_engine(engine, "sync")
+    profiler.instrument_engine(async_engine.sync_engine, "async")
+    app.add_middleware(profiler.ProfilerMiddleware)
+
+# Latence, requêtes en cours et requêtes SQL par route (voir /metrics)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(hashing.HashingPoolBusy)
+async def hashing_pool_busy_handler(request: Request, exc: hashing.HashingPoolBusy):
+    """Pool de hachage saturé : demander au client de réessayer"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(export_jobs.ExportQueueFull)
+async def export_queue_full_handler(request: Request, exc: export_jobs.ExportQueueFull):
+    """File des exports saturée : demander au client de réessayer"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many exports in progress, retry shortly"},
+        headers={"Retry-After": "5"},
+    )
+
+
 # Inclure les routers
 app.include_router(auth_router.router)
 app.include_router(users_router.router)
 app.include_router(tpe_router.router)
+if settings.SQL_PROFILER:
+    app.include_router(debug_router.router)
 
 
 @app.get("/")
@@ -97,12 +150,12 @@ async def root():
 
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """Health check endpoint"""
     try:
         # Vérifier la connexion à la base de données
         from sqlalchemy import text
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -110,10 +163,21 @@ async def health_check(db: Session = Depends(get_db)):
     return {
         "status": "healthy" if db_status == "healthy" else "degraded",
         "database": db_status,
+        "database_pools": pool_stats(),
+        "password_hashing": hashing.pool.metrics(),
+        "response_cache": response_cache.metrics(),
+        "export_jobs": export_jobs.jobs.metrics(),
+        "events": events.broker.metrics(),
         "timestamp": time.time()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métriques du worker au format texte Prometheus"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,45 @@
+"""
+Table indexée des cartes commerçants
+
+``tpes.merchant_cards`` (JSON) reste la représentation renvoyée par l'API ;
+la table ``merchant_cards`` en est une copie normalisée, tenue à jour à
+chaque écriture, qui permet de retrouver un TPE par numéro de carte ou par
+numéro de série en une lecture d'index.
+"""
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+import models
+
+
+def _rows(tpe_id: int, cards: Optional[list]) -> List[dict]:
+    if not isinstance(cards, list):
+        return []
+    return [
+        {
+            "tpe_id": tpe_id,
+            "numero": card.get("numero"),
+            "numero_serie_tpe": card.get("numero_serie_tpe"),
+        }
+        for card in cards
+        if isinstance(card, dict) and card.get("numero") is not None
+    ]
+
+
+def insert_cards(db: Session, tpes: Iterable[Tuple[int, Optional[list]]]) -> None:
+    """Insérer les cartes de plusieurs TPE en une seule instruction"""
+    rows = [row for tpe_id, cards in tpes for row in _rows(tpe_id, cards)]
+    if rows:
+        db.execute(insert(models.MerchantCard), rows)
+
+
+def replace_cards(db: Session, tpe_id: int, cards: Optional[list]) -> None:
+    """Remplacer les cartes d'un TPE"""
+    db.execute(delete(models.MerchantCard).where(models.MerchantCard.tpe_id == tpe_id))
+    insert_cards(db, [(tpe_id, cards)])
+
+
+def delete_cards(db: Session, tpe_ids: List[int]) -> None:
+    """Supprimer les cartes de TPE supprimés (la clé étrangère cascade aussi)"""
+    db.execute(delete(models.MerchantCard).where(models.MerchantCard.tpe_id.in_(tpe_ids)))
+
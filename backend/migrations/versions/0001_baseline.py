@@ -0,0 +1,70 @@
+"""Schéma initial : utilisateurs et TPE
+
+Les bases créées auparavant par ``Base.metadata.create_all`` contiennent déjà
+ces tables : elles sont conservées telles quelles.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(50), nullable=False),
+            sa.Column("email", sa.String(100), nullable=True),
+            sa.Column("hashed_password", sa.String(255), nullable=False),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+    
+    if not _has_table("tpes"):
+        op.create_table(
+            "tpes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("service_name", sa.String(200), nullable=False),
+            sa.Column("shop_id", sa.String(50), nullable=False),
+            sa.Column("regisseur_prenom", sa.String(100)),
+            sa.Column("regisseur_nom", sa.String(100)),
+            sa.Column("regisseur_telephone", sa.String(20)),
+            sa.Column("regisseurs_suppleants", sa.Text(), nullable=True),
+            sa.Column("merchant_cards", sa.JSON()),
+            sa.Column("tpe_model", sa.String(100)),
+            sa.Column("number_of_tpe", sa.Integer()),
+            sa.Column("connection_ethernet", sa.Boolean()),
+            sa.Column("connection_4g5g", sa.Boolean()),
+            sa.Column("network_ip_address", sa.String(45), nullable=True),
+            sa.Column("network_mask", sa.String(45), nullable=True),
+            sa.Column("network_gateway", sa.String(45), nullable=True),
+            sa.Column("backoffice_active", sa.Boolean()),
+            sa.Column("backoffice_email", sa.String(100), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_tpes_id", "tpes", ["id"])
+        op.create_index("ix_tpes_service_name", "tpes", ["service_name"])
+        op.create_index("ix_tpes_shop_id", "tpes", ["shop_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("tpes")
+    op.drop_table("users")
@@ -0,0 +1,36 @@
+"""Table des compteurs statistiques tpe_stats
+
+Revision ID: 0002_tpe_stats
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_tpe_stats"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+COUNTERS = [
+    "total", "desk_count", "move_count", "ethernet_count", "mobile_count",
+    "backoffice_active_count", "total_terminals", "desk_terminals", "move_terminals",
+    "both_connections_count", "ethernet_only_count", "mobile_only_count",
+    "no_connection_count", "merchant_cards_count", "with_merchant_cards_count",
+]
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("tpe_stats"):
+        return
+    # Ligne créée à la première lecture ou écriture (stats.rebuild, stats.apply_delta)
+    op.create_table(
+        "tpe_stats",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *[sa.Column(name, sa.BigInteger(), nullable=False) for name in COUNTERS],
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tpe_stats")
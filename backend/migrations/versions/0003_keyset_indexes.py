@@ -0,0 +1,38 @@
+"""Index composites pour la pagination par curseur
+
+Créés avec CREATE INDEX CONCURRENTLY sous PostgreSQL : la table reste
+accessible en écriture pendant la construction.
+
+Revision ID: 0003_keyset_indexes
+Revises: 0002_tpe_stats
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003_keyset_indexes"
+down_revision = "0002_tpe_stats"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_tpes_service_name_id": ["service_name", "id"],
+    "ix_tpes_created_at_id": ["created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, columns in INDEXES.items():
+            op.create_index(name, "tpes", columns, if_not_exists=True)
+        return
+    
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON tpes ({', '.join(columns)})"
+            )
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="tpes")
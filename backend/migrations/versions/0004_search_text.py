@@ -0,0 +1,100 @@
+"""Document de recherche normalisé et index trigrammes
+
+Revision ID: 0004_search_text
+Revises: 0003_keyset_indexes
+Create Date: 2026-10-17
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_search_text"
+down_revision = "0003_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+TRGM_INDEX_NAME = "ix_tpes_search_text_trgm"
+
+# Colonnes au moment de cette révision : la migration ne dépend pas des
+# modèles de l'application, qui évoluent après elle
+tpes = sa.table(
+    "tpes",
+    sa.column("id", sa.Integer),
+    sa.column("service_name", sa.String),
+    sa.column("shop_id", sa.String),
+    sa.column("regisseur_prenom", sa.String),
+    sa.column("regisseur_nom", sa.String),
+    sa.column("merchant_cards", sa.JSON),
+    sa.column("search_text", sa.Text),
+)
+
+
+# Copie figée de search.normalize / search.build_document à cette révision
+def _normalize(value) -> str:
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def _document(row) -> str:
+    parts = [
+        row.service_name,
+        row.shop_id,
+        " ".join(filter(None, [row.regisseur_prenom, row.regisseur_nom])),
+    ]
+    if isinstance(row.merchant_cards, list):
+        for card in row.merchant_cards:
+            if isinstance(card, dict):
+                parts.append(card.get("numero"))
+                parts.append(card.get("numero_serie_tpe"))
+    return " | ".join(_normalize(part) for part in parts if part)
+
+
+def _backfill(bind, batch_size: int = 1000) -> None:
+    """Calculer search_text pour les TPE existants, par lots"""
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(
+                tpes.c.id, tpes.c.service_name, tpes.c.shop_id, tpes.c.regisseur_prenom,
+                tpes.c.regisseur_nom, tpes.c.merchant_cards,
+            )
+            .where(tpes.c.search_text.is_(None), tpes.c.id > last_id)
+            .order_by(tpes.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        bind.execute(
+            tpes.update().where(tpes.c.id == sa.bindparam("tpe_id")),
+            [{"tpe_id": row.id, "search_text": _document(row)} for row in batch]
+        )
+        last_id = batch[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("tpes")}
+    if "search_text" not in columns:
+        op.add_column("tpes", sa.Column("search_text", sa.Text(), nullable=True))
+    
+    # Calculer le document des TPE existants
+    _backfill(bind)
+    
+    if bind.dialect.name != "postgresql":
+        return
+    
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {TRGM_INDEX_NAME} "
+            "ON tpes USING gin (search_text gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {TRGM_INDEX_NAME}")
+    op.drop_column("tpes", "search_text")
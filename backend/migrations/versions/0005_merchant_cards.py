@@ -0,0 +1,79 @@
+"""Table indexée des cartes commerçants, remplie depuis la colonne JSON
+
+Revision ID: 0005_merchant_cards
+Revises: 0004_search_text
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_merchant_cards"
+down_revision = "0004_search_text"
+branch_labels = None
+depends_on = None
+
+# Tables au moment de cette révision (indépendantes des modèles de l'application)
+tpes = sa.table("tpes", sa.column("id", sa.Integer), sa.column("merchant_cards", sa.JSON))
+cards_table = sa.table(
+    "merchant_cards",
+    sa.column("tpe_id", sa.Integer),
+    sa.column("numero", sa.String),
+    sa.column("numero_serie_tpe", sa.String),
+)
+
+
+def _backfill(bind, batch_size: int = 1000) -> None:
+    """Copier les cartes de la colonne JSON si la table est vide"""
+    if bind.execute(sa.select(sa.func.count()).select_from(cards_table)).scalar():
+        return
+    
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(tpes.c.id, tpes.c.merchant_cards)
+            .where(tpes.c.id > last_id)
+            .order_by(tpes.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        rows = [
+            {
+                "tpe_id": tpe_id,
+                "numero": card.get("numero"),
+                "numero_serie_tpe": card.get("numero_serie_tpe"),
+            }
+            for tpe_id, cards in batch
+            if isinstance(cards, list)
+            for card in cards
+            if isinstance(card, dict) and card.get("numero") is not None
+        ]
+        if rows:
+            bind.execute(cards_table.insert(), rows)
+        last_id = batch[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("merchant_cards"):
+        op.create_table(
+            "merchant_cards",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "tpe_id",
+                sa.Integer(),
+                sa.ForeignKey("tpes.id", ondelete="CASCADE"),
+                nullable=False
+            ),
+            sa.Column("numero", sa.String(100), nullable=False),
+            sa.Column("numero_serie_tpe", sa.String(100), nullable=True),
+        )
+        op.create_index("ix_merchant_cards_tpe_id", "merchant_cards", ["tpe_id"])
+        op.create_index("ix_merchant_cards_numero", "merchant_cards", ["numero"])
+        op.create_index("ix_merchant_cards_numero_serie_tpe", "merchant_cards", ["numero_serie_tpe"])
+    
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    op.drop_table("merchant_cards")
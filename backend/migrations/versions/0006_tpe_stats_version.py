@@ -0,0 +1,26 @@
+"""Version de la table tpes (validateur HTTP des lectures)
+
+Revision ID: 0006_tpe_stats_version
+Revises: 0005_merchant_cards
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_tpe_stats_version"
+down_revision = "0005_merchant_cards"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("tpe_stats")}
+    if "version" not in columns:
+        op.add_column(
+            "tpe_stats",
+            sa.Column("version", sa.BigInteger(), nullable=False, server_default="0")
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("tpe_stats", "version")
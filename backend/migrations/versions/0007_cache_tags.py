@@ -0,0 +1,30 @@
+"""Versions des étiquettes du cache de réponses
+
+Revision ID: 0007_cache_tags
+Revises: 0006_tpe_stats_version
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_cache_tags"
+down_revision = "0006_tpe_stats_version"
+branch_labels = None
+depends_on = None
+
+TAGS = ["tpes", "users"]
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("cache_tags"):
+        return
+    cache_tags = op.create_table(
+        "cache_tags",
+        sa.Column("tag", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(cache_tags, [{"tag": tag, "version": 0} for tag in TAGS])
+
+
+def downgrade() -> None:
+    op.drop_table("cache_tags")
@@ -0,0 +1,56 @@
+"""Flux de modifications des TPE : version par ligne et traces des suppressions
+
+Les lignes existantes reçoivent la version 0 : elles font toutes partie de
+la première synchronisation d'un client.
+
+Revision ID: 0008_tpe_changes
+Revises: 0007_cache_tags
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_tpe_changes"
+down_revision = "0007_cache_tags"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_tpes_change_version_id"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tpes")}
+    if "change_version" not in columns:
+        op.add_column(
+            "tpes",
+            sa.Column("change_version", sa.BigInteger(), nullable=False, server_default="0")
+        )
+    
+    if not inspector.has_table("tpe_tombstones"):
+        op.create_table(
+            "tpe_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tpe_id", sa.Integer(), nullable=False),
+            sa.Column("shop_id", sa.String(50), nullable=False),
+            sa.Column("change_version", sa.BigInteger(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_tpe_tombstones_tpe_id", "tpe_tombstones", ["tpe_id"])
+        op.create_index(
+            "ix_tpe_tombstones_change_version_tpe_id", "tpe_tombstones", ["change_version", "tpe_id"]
+        )
+    
+    # Comme 0003 : index construit sans bloquer les écritures sous PostgreSQL
+    if op.get_bind().dialect.name != "postgresql":
+        op.create_index(INDEX_NAME, "tpes", ["change_version", "id"], if_not_exists=True)
+        return
+    
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON tpes (change_version, id)")
+
+
+def downgrade() -> None:
+    op.drop_table("tpe_tombstones")
+    op.drop_index(INDEX_NAME, table_name="tpes")
+    op.drop_column("tpes", "change_version")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, JSON, Index, ForeignKey
 from sqlalchemy.sql import func
 from database import Base
 import uuid
@@ -59,11 +59,95 @@ class TPE(Base):
     backoffice_active = Column(Boolean, default=False)
     backoffice_email = Column(String(100), nullable=True)
     
+    # Document de recherche normalisé (voir search.build_document)
+    search_text = Column(Text, nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Version de la table à la dernière écriture de la ligne (flux de modifications)
+    change_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
+    # Index composites pour la pagination par curseur : WHERE (k, id) > (...)
+    __table_args__ = (
+        Index("ix_tpes_service_name_id", "service_name", "id"),
+        Index("ix_tpes_created_at_id", "created_at", "id"),
+        Index("ix_tpes_change_version_id", "change_version", "id"),
+        # Index trigrammes (PostgreSQL) pour les recherches LIKE '%terme%'
+        Index(
+            "ix_tpes_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+    )
+    
     def generate_shop_id(self):
         """Génère un ShopID unique si non fourni"""
         if not self.shop_id:
             self.shop_id = f"SHOP-{uuid.uuid4().hex[:8].upper()}"
+
+
+class MerchantCard(Base):
+    """Carte commerçant d'un TPE (copie indexée de TPE.merchant_cards)"""
+    __tablename__ = "merchant_cards"
+    
+    id = Column(Integer, primary_key=True)
+    tpe_id = Column(Integer, ForeignKey("tpes.id", ondelete="CASCADE"), nullable=False, index=True)
+    numero = Column(String(100), nullable=False, index=True)
+    numero_serie_tpe = Column(String(100), nullable=True, index=True)
+
+
+class TPETombstone(Base):
+    """Trace d'un TPE supprimé, lue par le flux de modifications"""
+    __tablename__ = "tpe_tombstones"
+    
+    id = Column(Integer, primary_key=True)
+    tpe_id = Column(Integer, nullable=False, index=True)
+    shop_id = Column(String(50), nullable=False)
+    change_version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_tpe_tombstones_change_version_tpe_id", "change_version", "tpe_id"),
+    )
+
+
+class TPEStatsCounter(Base):
+    """Compteurs statistiques des TPE, maintenus à chaque écriture (ligne unique)"""
+    __tablename__ = "tpe_stats"
+    
+    id = Column(Integer, primary_key=True)
+    
+    total = Column(BigInteger, nullable=False, default=0)
+    desk_count = Column(BigInteger, nullable=False, default=0)
+    move_count = Column(BigInteger, nullable=False, default=0)
+    ethernet_count = Column(BigInteger, nullable=False, default=0)
+    mobile_count = Column(BigInteger, nullable=False, default=0)
+    backoffice_active_count = Column(BigInteger, nullable=False, default=0)
+    
+    total_terminals = Column(BigInteger, nullable=False, default=0)
+    desk_terminals = Column(BigInteger, nullable=False, default=0)
+    move_terminals = Column(BigInteger, nullable=False, default=0)
+    
+    both_connections_count = Column(BigInteger, nullable=False, default=0)
+    ethernet_only_count = Column(BigInteger, nullable=False, default=0)
+    mobile_only_count = Column(BigInteger, nullable=False, default=0)
+    no_connection_count = Column(BigInteger, nullable=False, default=0)
+    
+    merchant_cards_count = Column(BigInteger, nullable=False, default=0)
+    with_merchant_cards_count = Column(BigInteger, nullable=False, default=0)
+    
+    # Version de la table tpes (incrémentée à chaque écriture, sert d'ETag)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CacheTag(Base):
+    """Version d'une étiquette du cache de réponses (voir cache.invalidate)"""
+    __tablename__ = "cache_tags"
+    
+    tag = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
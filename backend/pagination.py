@@ -0,0 +1,61 @@
+"""
+Pagination par curseur (keyset)
+
+Le curseur est un jeton opaque encodant la dernière clé de tri vue et l'id
+du TPE correspondant ; la page suivante est lue avec ``WHERE (k, id) > (...)``
+au lieu d'un ``OFFSET`` dont le coût croît avec la profondeur.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+# Clés de tri autorisées en mode curseur
+SORT_KEYS = ("id", "service_name", "shop_id", "created_at")
+
+# Clés déjà uniques : pas besoin de départager par l'id
+UNIQUE_SORT_KEYS = ("id", "shop_id")
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou incompatible avec le tri demandé"""
+
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    """Encoder la position (clé de tri, id) dans un jeton opaque"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: str, order: str) -> Tuple[Any, int]:
+    """Décoder un jeton et vérifier qu'il correspond au tri demandé"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_sort, cursor_order, value, last_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor("Invalid cursor")
+    
+    if cursor_sort != sort or cursor_order != order or not isinstance(last_id, int):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    
+    if sort == "created_at" and value is not None:
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Invalid cursor")
+    
+    return value, last_id
+
+
+def parse_estimate(plan: Any) -> Optional[int]:
+    """Extraire le nombre de lignes estimé d'un EXPLAIN (FORMAT JSON)"""
+    try:
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
@@ -0,0 +1,240 @@
+"""
+Profilage SQL par requête (``SQL_PROFILER=True`` uniquement)
+
+Chaque requête HTTP reçoit un identifiant ; les requêtes SQL qu'elle exécute
+sont enregistrées avec leur durée et leur origine dans le code. Deux motifs
+sont signalés :
+
+- ``repeated`` : même forme de requête exécutée plusieurs fois (N+1 probable,
+  lectures en double) ;
+- ``same_filter`` : formes différentes lisant les mêmes lignes (``FROM`` et
+  ``WHERE`` identiques), typiquement une page suivie de son ``count()``.
+
+Le résumé est renvoyé dans les en-têtes ``X-Debug-Request-Id`` et
+``X-Debug-SQL`` ; le détail complet est servi par
+``GET /_debug/requests/{id}``. Sans ``SQL_PROFILER``, rien n'est installé
+(ni middleware ni écouteurs SQLAlchemy) : aucun coût.
+"""
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+# Seuil de signalement des formes répétées
+REPEAT_THRESHOLD = 2
+
+# Profils conservés en mémoire (par worker)
+HISTORY_SIZE = 200
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_IN_LIST = re.compile(r"\bIN \((?:\?(?:, )?)+\)", re.IGNORECASE)
+_CORE = re.compile(r"\bFROM (?!\()(.*?)(?: ORDER BY | GROUP BY | LIMIT | OFFSET |$)", re.IGNORECASE)
+_SUBQUERY_ALIAS = re.compile(r"\) AS \w+$")
+
+
+def statement_shape(statement: str) -> str:
+    """Forme normalisée : littéraux et paramètres remplacés par ?"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("IN (?)", shape)
+
+
+def statement_core(shape: str) -> Optional[str]:
+    """Tables et filtres lus par une requête SELECT (sans tri ni pagination)"""
+    if not shape.upper().startswith("SELECT"):
+        return None
+    match = _CORE.search(shape)
+    if match is None:
+        return None
+    return _SUBQUERY_ALIAS.sub("", match.group(1).strip())
+
+
+def _origin() -> Optional[str]:
+    """Dernière ligne du code de l'application dans la pile d'appel"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_BACKEND_DIR) and filename != __file__:
+            relative = os.path.relpath(filename, _BACKEND_DIR)
+            return f"{relative}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Requêtes SQL d'une requête HTTP"""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.started = time.time()
+        self.duration: Optional[float] = None
+        self.statements: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float, engine: str, origin: Optional[str]) -> None:
+        with self._lock:
+            self.statements.append({
+                "statement": statement,
+                "duration_ms": round(duration * 1000, 3),
+                "engine": engine,
+                "origin": origin,
+            })
+
+    def findings(self) -> List[dict]:
+        """Formes répétées et formes différentes lisant les mêmes lignes"""
+        with self._lock:
+            statements = list(self.statements)
+
+        shapes: "OrderedDict[str, List[dict]]" = OrderedDict()
+        for item in statements:
+            shapes.setdefault(statement_shape(item["statement"]), []).append(item)
+
+        findings = []
+        for shape, items in shapes.items():
+            if len(items) >= REPEAT_THRESHOLD:
+                findings.append({
+                    "kind": "repeated",
+                    "count": len(items),
+                    "total_ms": round(sum(item["duration_ms"] for item in items), 3),
+                    "shape": shape,
+                    "origins": sorted({item["origin"] for item in items if item["origin"]}),
+                })
+
+        cores: "OrderedDict[str, List[str]]" = OrderedDict()
+        for shape in shapes:
+            core = statement_core(shape)
+            if core:
+                cores.setdefault(core, []).append(shape)
+        for core, core_shapes in cores.items():
+            if len(core_shapes) > 1:
+                findings.append({
+                    "kind": "same_filter",
+                    "count": len(core_shapes),
+                    "core": core,
+                    "shapes": core_shapes,
+                })
+        return findings
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            durations = [item["duration_ms"] for item in self.statements]
+        findings = self.findings()
+        return {
+            "queries": len(durations),
+            "time_ms": round(sum(durations), 3),
+            "repeated": sum(1 for finding in findings if finding["kind"] == "repeated"),
+            "same_filter": sum(1 for finding in findings if finding["kind"] == "same_filter"),
+        }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            statements = list(self.statements)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started": self.started,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "summary": self.summary(),
+            "findings": self.findings(),
+            "statements": statements,
+        }
+
+
+class ProfileStore:
+    """Derniers profils, par identifiant"""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self, limit: int) -> List[RequestProfile]:
+        with self._lock:
+            return list(self._profiles.values())[-limit:][::-1]
+
+
+store = ProfileStore()
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("request_profile", default=None)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Enregistrer les requêtes SQL du moteur dans le profil courant"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info["profile_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("profile_start", None)
+        profile = _current_profile.get()
+        if start is None or profile is None:
+            return
+        profile.record(statement, time.perf_counter() - start, name, _origin())
+
+
+class ProfilerMiddleware:
+    """Middleware ASGI : profil SQL de chaque requête et en-têtes de synthèse"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/_debug"):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        store.add(profile)
+
+        async def send_with_summary(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                # Requêtes exécutées avant l'envoi des en-têtes (un flux peut
+                # en exécuter d'autres : voir /_debug/requests/{id})
+                summary = profile.summary()
+                headers = MutableHeaders(scope=message)
+                headers["X-Debug-Request-Id"] = profile.id
+                headers["X-Debug-SQL"] = "; ".join(f"{key}={value}" for key, value in summary.items())
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_summary)
+        finally:
+            profile.duration = time.perf_counter() - start
+            _current_profile.reset(token)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from database import get_db
+from database import get_async_db
 from config import get_settings
 import schemas
 import auth
+import async_crud
 
 settings = get_settings()
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -13,27 +14,57 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 @router.post("/login", response_model=schemas.Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Connexion et génération de token JWT"""
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    # Trop d'échecs récents : refuser sans consommer de hachage bcrypt.
+    # Adresse du client réel : uvicorn lit X-Forwarded-For posé par nginx
+    # (--proxy-headers, --forwarded-allow-ips)
+    client = request.client.host if request.client else None
+    throttle_key = (form_data.username.lower(), client)
+    retry_after = max(
+        auth.login_throttle.retry_after(throttle_key),
+        auth.client_login_throttle.retry_after(client),
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    user = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        auth.login_throttle.record_failure(throttle_key)
+        auth.client_login_throttle.record_failure(client)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    auth.login_throttle.reset(throttle_key)
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=auth.token_claims(user), expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: schemas.User = Depends(auth.get_current_active_user)):
+async def read_users_me(
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Obtenir les informations de l'utilisateur courant"""
-    return current_user
+    user = await async_crud.get_user_by_username(db, current_user.username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+import schemas
+import auth
+import profiler
+
+# Inclus uniquement si SQL_PROFILER est activé (voir main.py)
+router = APIRouter(prefix="/_debug", tags=["debug"])
+
+
+@router.get("/requests")
+async def get_recent_profiles(
+    limit: int = Query(20, ge=1, le=profiler.HISTORY_SIZE),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Derniers profils SQL (synthèse), du plus récent au plus ancien"""
+    return [
+        {
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "status": profile.status,
+            "summary": profile.summary()
+        }
+        for profile in profiler.store.recent(limit)
+    ]
+
+
+@router.get("/requests/{request_id}")
+async def get_profile(
+    request_id: str,
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Profil SQL complet d'une requête (X-Debug-Request-Id)"""
+    profile = profiler.store.get(request_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Request profile not found"
+        )
+    return profile.to_dict()
@@ -1,154 +1,546 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import Optional
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from database import get_async_db, SessionLocal
+from config import get_settings
+from pagination import InvalidCursor
+from instrumentation import timed_export
 import schemas
-import crud
+import importer
+import async_crud
 import auth
-import models
-from openpyxl import Workbook
-from io import BytesIO
+import cache
+import conditional
+import events
+import export_formats
+import export_jobs
+import export_rows
+import serializers
+import suggest
+import search as search_index
+from cache import response_cache
 from datetime import datetime
 import math
+import os
 
+settings = get_settings()
 router = APIRouter(prefix="/api/tpe", tags=["tpe"])
 
 
-@router.get("/", response_model=schemas.PaginatedTPE)
+def _serialize(model, value):
+    """Représentation JSON d'une réponse, telle que mise en cache"""
+    return model.model_validate(value).model_dump(mode="json")
+
+
+def _serialize_tpe(tpe) -> dict:
+    """TPE lu en base : projection directe, ou revalidation par schemas.TPE"""
+    if settings.FAST_SERIALIZATION:
+        return serializers.tpe_to_dict(tpe)
+    return _serialize(schemas.TPE, tpe)
+
+
+def _respond(content, response: Response, projected: bool = False):
+    """Contenu déjà sérialisé : encodé tel quel (sans repasser par response_model)"""
+    # Une page réduite à quelques champs ne correspond pas à schemas.TPE
+    if not settings.FAST_SERIALIZATION and not projected:
+        return content
+    return serializers.FastJSONResponse(content, headers=response.headers)
+
+
+async def _table_validators(db: AsyncSession, *parts) -> conditional.Validators:
+    """Validateurs dérivés de la version de la table tpes"""
+    version, last_modified = await async_crud.get_tpe_version(db)
+    return conditional.Validators(conditional.make_etag(*parts, version), last_modified)
+
+
+@router.get("/", response_model=Union[schemas.PaginatedTPE, schemas.CursorPageTPE])
 async def get_tpes(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    search: Optional[str] = Query(None, description="Search by service name or ShopID"),
+    search: Optional[str] = Query(None, description="Search by service name, ShopID, régisseur or merchant card"),
     tpe_model: Optional[str] = Query(None, description="Filter by TPE model"),
     connection_type: Optional[str] = Query(None, description="Filter by connection type (ethernet/4g5g)"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="Pagination mode"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor (cursor mode)"),
+    sort: str = Query("id", pattern="^(id|service_name|shop_id|created_at)$", description="Sort key (cursor mode)"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Sort order (cursor mode)"),
+    total_mode: str = Query("exact", alias="total", pattern="^(exact|estimate|none)$", description="Total count mode (cursor mode)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id always included), or 'summary' for the list table columns"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Récupérer tous les TPE avec pagination et filtres"""
-    skip = (page - 1) * page_size
-    
-    tpes, total = crud.get_tpes(
-        db,
-        skip=skip,
-        limit=page_size,
-        search=search,
-        tpe_model=tpe_model,
-        connection_type=connection_type
-    )
+    # Projection : seules ces colonnes sont lues en base
+    columns = None
+    if fields:
+        try:
+            columns = serializers.parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
     
-    total_pages = math.ceil(total / page_size) if total > 0 else 1
+    # Page inchangée tant que la table ne l'est pas : 304 sans lire les lignes
+    validators = await _table_validators(db, "tpes", sorted(request.query_params.multi_items()))
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
     
-    return {
-        "items": tpes,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages
+    params = {
+        "page": page, "page_size": page_size, "search": search, "tpe_model": tpe_model,
+        "connection_type": connection_type, "pagination": pagination, "cursor": cursor,
+        "sort": sort, "order": order, "total": total_mode, "fields": columns
     }
+    
+    def page_items(tpes) -> list:
+        if columns:
+            return serializers.tpes_to_list(tpes, columns)
+        return [_serialize_tpe(tpe) for tpe in tpes]
+    
+    async def load_page():
+        if pagination == "cursor" or cursor:
+            try:
+                tpes, next_cursor, count = await async_crud.get_tpes_keyset(
+                    db,
+                    limit=page_size,
+                    cursor=cursor,
+                    sort=sort,
+                    order=order,
+                    search=search,
+                    tpe_model=tpe_model,
+                    connection_type=connection_type,
+                    total_mode=total_mode,
+                    columns=columns
+                )
+            except InvalidCursor as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            
+            return {
+                "items": page_items(tpes),
+                "next_cursor": next_cursor,
+                "page_size": page_size,
+                "total": count,
+                "total_is_estimate": total_mode == "estimate" and count is not None
+            }
+        
+        skip = (page - 1) * page_size
+        
+        tpes, total = await async_crud.get_tpes(
+            db,
+            skip=skip,
+            limit=page_size,
+            search=search,
+            tpe_model=tpe_model,
+            connection_type=connection_type,
+            columns=columns
+        )
+        
+        total_pages = math.ceil(total / page_size) if total > 0 else 1
+        
+        return {
+            "items": page_items(tpes),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages
+        }
+    
+    content = await response_cache.get_or_load(db, "tpe:list", params, [cache.TPES_TAG], load_page)
+    return _respond(content, response, projected=columns is not None)
+
+
+@router.get("/suggest", response_model=List[schemas.TPESuggestion])
+async def suggest_tpes(
+    q: str = Query(..., min_length=1, max_length=100, description="Beginning of a service name or ShopID"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Suggestions à la frappe depuis l'index en mémoire (sans requête SQL)"""
+    return suggest.index.suggest(q, limit=limit)
+
+
+@router.get("/by-serial/{serial}", response_model=List[schemas.TPE])
+async def get_tpes_by_serial(
+    serial: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Retrouver le(s) TPE par numéro de série de terminal"""
+    return await async_crud.get_tpes_by_card_serial(db, serial)
+
+
+@router.get("/by-card/{numero}", response_model=List[schemas.TPE])
+async def get_tpes_by_card(
+    numero: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Retrouver le(s) TPE auxquels une carte commerçant est attribuée"""
+    return await async_crud.get_tpes_by_card_number(db, numero)
 
 
 @router.get("/stats/summary", response_model=schemas.TPEStats)
 async def get_tpe_statistics(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Obtenir les statistiques des TPE"""
-    stats = crud.get_tpe_stats(db)
-    return stats
-
-
-@router.get("/export/excel")
-async def export_tpes_to_excel(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
-):
-    """Exporter tous les TPE vers Excel"""
-    tpes, _ = crud.get_tpes(db, skip=0, limit=10000)
-    
-    # Créer un classeur Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "TPE List"
-    
-    # En-têtes
-    headers = [
-        "ID", "Service Name", "ShopID", "Régisseur Prénom", "Régisseur Nom",
-        "Régisseur Téléphone", "Régisseurs Suppléants", "Modèle TPE",
-        "Nombre de TPE", "Connexion Ethernet", "Connexion 4G/5G",
-        "IP Address", "Mask", "Gateway", "Backoffice Actif",
-        "Backoffice Email", "Date de création"
-    ]
-    ws.append(headers)
-    
-    # Données
-    for tpe in tpes:
-        merchant_cards_str = "; ".join([
-            f"{card.get('numero', '')} ({card.get('numero_serie_tpe', '')})"
-            for card in tpe.merchant_cards
-        ]) if tpe.merchant_cards else ""
-        
-        ws.append([
-            tpe.id,
-            tpe.service_name,
-            tpe.shop_id,
-            tpe.regisseur_prenom or "",
-            tpe.regisseur_nom or "",
-            tpe.regisseur_telephone or "",
-            tpe.regisseurs_suppleants or "",
-            tpe.tpe_model or "",
-            tpe.number_of_tpe,
-            "Oui" if tpe.connection_ethernet else "Non",
-            "Oui" if tpe.connection_4g5g else "Non",
-            tpe.network_ip_address or "",
-            tpe.network_mask or "",
-            tpe.network_gateway or "",
-            "Oui" if tpe.backoffice_active else "Non",
-            tpe.backoffice_email or "",
-            tpe.created_at.strftime("%Y-%m-%d %H:%M:%S") if tpe.created_at else ""
-        ])
-    
-    # Sauvegarder dans un buffer
-    excel_buffer = BytesIO()
-    wb.save(excel_buffer)
-    excel_buffer.seek(0)
+    validators = await _table_validators(db, "stats")
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    
+    async def load_stats():
+        return await async_crud.get_tpe_stats(db)
+    
+    return await response_cache.get_or_load(db, "tpe:stats", {}, [cache.TPES_TAG], load_stats)
+
+
+@router.get("/changes", response_model=schemas.TPEChanges)
+async def get_tpe_changes(
+    response: Response,
+    since: Optional[str] = Query(None, description="Token returned as next_token by the previous call (omit for a full sync)"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes (items + deleted)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """TPE créés, modifiés ou supprimés depuis le jeton since"""
+    try:
+        tpes, tombstones, next_token, has_more = await async_crud.get_tpe_changes(db, since=since, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    content = {
+        "items": [_serialize_tpe(tpe) for tpe in tpes],
+        "deleted": [
+            {
+                "id": tombstone.tpe_id,
+                "shop_id": tombstone.shop_id,
+                "deleted_at": serializers.isoformat(tombstone.deleted_at)
+            }
+            for tombstone in tombstones
+        ],
+        "next_token": next_token,
+        "has_more": has_more
+    }
+    return _respond(content, response)
+
+
+@router.get("/events")
+async def stream_tpe_events(
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Flux Server-Sent Events des créations, modifications et suppressions de TPE"""
+    return StreamingResponse(
+        events.broker.stream(settings.EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Nginx : transmettre chaque événement sans mise en tampon
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+def _export_rows(batch_size: int, filters: dict):
+    """Générer les lignes d'export avec une session dédiée au flux"""
+    # La session de la requête est fermée avant l'envoi du corps en streaming
+    db = SessionLocal()
+    try:
+        yield from export_rows.iter_rows(db, batch_size=batch_size, filters=filters)
+    finally:
+        db.close()
+
+
+def _check_export_format(export_format: str) -> None:
+    if not export_formats.available(export_format):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Export format unavailable: {export_format}"
+        )
+
+
+@router.get("/export/{export_format}")
+async def export_tpes(
+    export_format: str,
+    search: Optional[str] = Query(None, description="Same filters as GET /api/tpe/"),
+    tpe_model: Optional[str] = Query(None),
+    connection_type: Optional[str] = Query(None, pattern="^(ethernet|4g5g)$"),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Exporter les TPE (xlsx/excel, csv, ndjson, parquet) en flux, mémoire constante"""
+    # /export/excel : ancienne adresse de l'export XLSX
+    if export_format == "excel":
+        export_format = "xlsx"
+    _check_export_format(export_format)
+    export = export_formats.FORMATS[export_format]
+    filters = {"search": search, "tpe_model": tpe_model, "connection_type": connection_type}
     
     # Nom du fichier avec timestamp
-    filename = f"tpe_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    filename = f"tpe_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export.extension}"
     
     return StreamingResponse(
-        excel_buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        timed_export(export.stream(_export_rows(settings.EXPORT_BATCH_SIZE, filters)), export_format),
+        media_type=export.media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
+def _export_job_view(job: dict) -> dict:
+    """État public d'un job : progression et lien de téléchargement"""
+    view = dict(job)
+    if job["state"] == "done":
+        view["progress"] = 1.0
+        view["download_url"] = f"{router.prefix}/exports/{job['id']}/download"
+    elif job["rows_total"]:
+        view["progress"] = round(min(job["rows_done"] / job["rows_total"], 1.0), 4)
+    return view
+
+
+@router.post("/exports", response_model=schemas.ExportJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    export: schemas.ExportJobCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Lancer un export en tâche de fond (ou réutiliser le même export déjà produit)"""
+    _check_export_format(export.format)
+    selection = export.filter or schemas.TPEFilter()
+    # Filtre vide et filtre absent désignent le même export
+    filters = {key: value or None for key, value in selection.dict().items()}
+    version, _ = await async_crud.get_tpe_version(db)
+    
+    job = await run_in_threadpool(export_jobs.jobs.submit, export.format, filters, version)
+    if job["state"] == "done":
+        response.status_code = status.HTTP_200_OK
+    return _export_job_view(job)
+
+
+@router.get("/exports/{job_id}", response_model=schemas.ExportJob)
+async def get_export_job(
+    job_id: str,
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """État et progression d'un export"""
+    job = export_jobs.jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    return _export_job_view(job)
+
+
+def _file_chunks(handle, start: int, length: int, chunk_size: int = 64 * 1024):
+    """Lire une plage d'un fichier ouvert, par morceaux"""
+    try:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+@router.get("/exports/{job_id}/download")
+async def download_export(
+    job_id: str,
+    request: Request,
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Télécharger le fichier d'un export terminé (reprise par Range)"""
+    job = export_jobs.jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    if job["state"] != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export is {job['state']}"
+        )
+    
+    # Fichier ouvert avant l'envoi : un nettoyage concurrent ne coupe pas le flux
+    try:
+        handle = open(export_jobs.jobs.result_path(job), "rb")
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    size = os.fstat(handle.fileno()).st_size
+    etag = f'"{job["id"]}"'
+    
+    try:
+        requested = conditional.byte_range(request, size, etag)
+    except conditional.RangeNotSatisfiable:
+        handle.close()
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    start, end = requested or (0, size - 1)
+    
+    extension, media_type, _ = export_formats.FORMATS[job["format"]]
+    created = datetime.fromisoformat(job["created_at"])
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Length": str(end - start + 1),
+        "Content-Disposition": f"attachment; filename=tpe_export_{created.strftime('%Y%m%d_%H%M%S')}.{extension}"
+    }
+    if requested:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    return StreamingResponse(
+        _file_chunks(handle, start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if requested else status.HTTP_200_OK,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _import_file(file: UploadFile, dry_run: bool) -> dict:
+    """Importer un fichier avec une session dédiée (exécuté hors boucle)"""
+    db = SessionLocal()
+    try:
+        rows = importer.iter_rows(file.file, file.filename or "")
+        return importer.import_tpes(
+            db, rows, batch_size=settings.IMPORT_BATCH_SIZE, dry_run=dry_run
+        )
+    finally:
+        db.close()
+
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_tpes(
+    file: UploadFile = File(..., description="CSV or XLSX file using the Excel export columns"),
+    dry_run: bool = Query(False, description="Validate only, do not insert"),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Importer des TPE en masse depuis un fichier CSV ou XLSX"""
+    try:
+        report = await run_in_threadpool(_import_file, file, dry_run)
+    except importer.ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if not dry_run and report["imported"]:
+        await events.broker.publish(events.bulk_event("imported", report["imported"]))
+    return report
+
+
+def _bulk_selector(selection: schemas.TPEBulkSelection) -> dict:
+    """Traduire une sélection en arguments crud (refuse une sélection vide)"""
+    filters = selection.filter.dict(exclude_none=True) if selection.filter else {}
+    # Recherche réduite à rien une fois normalisée (ponctuation, accents seuls) : ignorée
+    if "search" in filters and not search_index.normalize(filters["search"]):
+        del filters["search"]
+    if not selection.ids and not filters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide ids or at least one filter"
+        )
+    return dict(filters, ids=selection.ids)
+
+
+@router.patch("/bulk", response_model=schemas.TPEBulkResult)
+async def bulk_update_tpes(
+    bulk: schemas.TPEBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Modifier plusieurs TPE en une seule transaction"""
+    selector = _bulk_selector(bulk)
+    changes = bulk.changes.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No changes provided"
+        )
+    
+    affected = await async_crud.bulk_update_tpes(db, changes, **selector)
+    if affected:
+        await events.broker.publish(events.bulk_event("bulk_updated", affected))
+    return {"affected": affected}
+
+
+@router.delete("/bulk", response_model=schemas.TPEBulkResult)
+async def bulk_delete_tpes(
+    selection: schemas.TPEBulkSelection,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Supprimer plusieurs TPE en une seule transaction"""
+    affected = await async_crud.bulk_delete_tpes(db, **_bulk_selector(selection))
+    if affected:
+        await events.broker.publish(events.bulk_event("bulk_deleted", affected))
+    return {"affected": affected}
+
+
 @router.get("/{tpe_id}", response_model=schemas.TPE)
 async def get_tpe(
     tpe_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Récupérer un TPE par ID"""
-    tpe = crud.get_tpe(db, tpe_id=tpe_id)
+    # Seule la date de modification est lue avant de décider du 304
+    last_modified = await async_crud.get_tpe_last_modified(db, tpe_id)
+    if last_modified:
+        validators = conditional.Validators(
+            conditional.make_etag("tpe", tpe_id, last_modified.isoformat()), last_modified
+        )
+        if validators.matches(request):
+            return validators.not_modified()
+        validators.apply(response)
+    
+    async def load_tpe():
+        tpe = await async_crud.get_tpe(db, tpe_id=tpe_id)
+        return _serialize_tpe(tpe) if tpe else None
+    
+    tpe = await response_cache.get_or_load(db, "tpe:detail", {"id": tpe_id}, [cache.TPES_TAG], load_tpe)
     if not tpe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="TPE not found"
         )
-    return tpe
+    return _respond(tpe, response)
 
 
 @router.post("/", response_model=schemas.TPE, status_code=status.HTTP_201_CREATED)
 async def create_tpe(
     tpe: schemas.TPECreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Créer un nouveau TPE"""
     # Vérifier si le ShopID existe déjà
     if tpe.shop_id:
-        existing_tpe = crud.get_tpe_by_shop_id(db, shop_id=tpe.shop_id)
+        existing_tpe = await async_crud.get_tpe_by_shop_id(db, shop_id=tpe.shop_id)
         if existing_tpe:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -162,20 +554,22 @@ async def create_tpe(
             detail="Maximum 8 merchant cards allowed"
         )
     
-    return crud.create_tpe(db=db, tpe=tpe)
+    db_tpe = await async_crud.create_tpe(db=db, tpe=tpe)
+    await events.broker.publish(events.tpe_event("created", db_tpe))
+    return db_tpe
 
 
 @router.put("/{tpe_id}", response_model=schemas.TPE)
 async def update_tpe(
     tpe_id: int,
     tpe_update: schemas.TPEUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Mettre à jour un TPE"""
     # Vérifier si le ShopID existe déjà (si modifié)
     if tpe_update.shop_id:
-        existing_tpe = crud.get_tpe_by_shop_id(db, shop_id=tpe_update.shop_id)
+        existing_tpe = await async_crud.get_tpe_by_shop_id(db, shop_id=tpe_update.shop_id)
         if existing_tpe and existing_tpe.id != tpe_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -189,25 +583,27 @@ async def update_tpe(
             detail="Maximum 8 merchant cards allowed"
         )
     
-    db_tpe = crud.update_tpe(db, tpe_id=tpe_id, tpe_update=tpe_update)
+    db_tpe = await async_crud.update_tpe(db, tpe_id=tpe_id, tpe_update=tpe_update)
     if not db_tpe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="TPE not found"
         )
+    await events.broker.publish(events.tpe_event("updated", db_tpe))
     return db_tpe
 
 
 @router.delete("/{tpe_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_tpe(
     tpe_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     """Supprimer un TPE"""
-    success = crud.delete_tpe(db, tpe_id=tpe_id)
+    success = await async_crud.delete_tpe(db, tpe_id=tpe_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="TPE not found"
         )
+    await events.broker.publish(events.deleted_event(tpe_id))
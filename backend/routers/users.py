@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db
 import schemas
-import crud
+import async_crud
 import auth
-import models
+import cache
+from cache import response_cache
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -14,23 +15,28 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 async def get_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     """Récupérer tous les utilisateurs (admin uniquement)"""
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+    async def load_users():
+        users = await async_crud.get_users(db, skip=skip, limit=limit)
+        return [schemas.User.model_validate(user).model_dump(mode="json") for user in users]
+    
+    return await response_cache.get_or_load(
+        db, "users:list", {"skip": skip, "limit": limit}, [cache.USERS_TAG], load_users
+    )
 
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user: schemas.UserCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     """Créer un nouvel utilisateur (admin uniquement)"""
     # Vérifier si l'utilisateur existe déjà
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await async_crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -38,25 +44,25 @@ async def create_user(
         )
     
     if user.email:
-        db_user = crud.get_user_by_email(db, email=user.email)
+        db_user = await async_crud.get_user_by_email(db, email=user.email)
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
     
-    return crud.create_user(db=db, user=user)
+    return await async_crud.create_user(db=db, user=user)
 
 
 @router.put("/{user_id}", response_model=schemas.User)
 async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     """Mettre à jour un utilisateur (admin uniquement)"""
-    db_user = crud.update_user(db, user_id=user_id, user_update=user_update)
+    db_user = await async_crud.update_user(db, user_id=user_id, user_update=user_update)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,8 +74,8 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     """Supprimer un utilisateur (admin uniquement)"""
     # Empêcher de supprimer son propre compte
@@ -79,7 +85,7 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
-    success = crud.delete_user(db, user_id=user_id)
+    success = await async_crud.delete_user(db, user_id=user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, field_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -31,6 +31,17 @@ class User(UserBase):
         from_attributes = True
 
 
+class CurrentUser(BaseModel):
+    """Champs minimaux de l'utilisateur authentifié (mis en cache)"""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    
+    class Config:
+        from_attributes = True
+
+
 # Auth Schemas
 class Token(BaseModel):
     access_token: str
@@ -116,6 +127,96 @@ class TPE(TPEBase):
         from_attributes = True
 
 
+class TPESuggestion(BaseModel):
+    id: int
+    service_name: str
+    shop_id: str
+
+
+# Bulk Schemas
+class TPEFilter(BaseModel):
+    """Mêmes filtres que GET /api/tpe/"""
+    search: Optional[str] = None
+    tpe_model: Optional[str] = None
+    connection_type: Optional[str] = Field(None, pattern="^(ethernet|4g5g)$")
+    
+    @field_validator("search", "tpe_model", "connection_type", mode="before")
+    @classmethod
+    def blank_as_none(cls, value):
+        # Un filtre vide ou blanc est ignoré par la liste : il ne filtre rien
+        if isinstance(value, str):
+            return value.strip() or None
+        return value
+
+
+class TPEBulkChanges(BaseModel):
+    """Champs modifiables en masse (hors champs indexés pour la recherche)"""
+    regisseur_telephone: Optional[str] = Field(None, max_length=20)
+    regisseurs_suppleants: Optional[str] = None
+    tpe_model: Optional[str] = Field(None, pattern="^(Ingenico Desk 5000|Ingenico Move 5000)$")
+    number_of_tpe: Optional[int] = Field(None, ge=1)
+    connection_ethernet: Optional[bool] = None
+    connection_4g5g: Optional[bool] = None
+    network_ip_address: Optional[str] = None
+    network_mask: Optional[str] = None
+    network_gateway: Optional[str] = None
+    backoffice_active: Optional[bool] = None
+    backoffice_email: Optional[EmailStr] = None
+    
+    class Config:
+        extra = "forbid"
+
+
+class TPEBulkSelection(BaseModel):
+    """Sélection par liste d'ids et/ou par filtres"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[TPEFilter] = None
+
+
+class TPEBulkUpdate(TPEBulkSelection):
+    changes: TPEBulkChanges
+
+
+class TPEBulkResult(BaseModel):
+    affected: int
+
+
+# Export Job Schemas
+class ExportJobCreate(BaseModel):
+    format: str = Field("xlsx", pattern="^(xlsx|csv|ndjson|parquet)$")
+    filter: Optional[TPEFilter] = None
+
+
+class ExportJob(BaseModel):
+    id: str
+    format: str
+    filter: TPEFilter
+    state: str
+    rows_done: int
+    rows_total: Optional[int] = None
+    progress: Optional[float] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+
+# Import Schemas
+class ImportRowError(BaseModel):
+    row: int
+    shop_id: Optional[str] = None
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    dry_run: bool
+    errors: List[ImportRowError]
+
+
 # Statistics Schema
 class TPEStats(BaseModel):
     total: int
@@ -124,6 +225,21 @@ class TPEStats(BaseModel):
     ethernet_count: int
     mobile_count: int
     backoffice_active_count: int
+    
+    # Nombre de terminaux (somme de number_of_tpe) par modèle
+    total_terminals: int
+    desk_terminals: int
+    move_terminals: int
+    
+    # Combinaisons de types de connexion
+    both_connections_count: int
+    ethernet_only_count: int
+    mobile_only_count: int
+    no_connection_count: int
+    
+    # Cartes commerçants
+    merchant_cards_count: int
+    with_merchant_cards_count: int
 
 
 # Pagination Schema
@@ -133,3 +249,25 @@ class PaginatedTPE(BaseModel):
     page: int
     page_size: int
     total_pages: int
+
+
+class CursorPageTPE(BaseModel):
+    items: List[TPE]
+    next_cursor: Optional[str] = None
+    page_size: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
+# Change Feed Schemas
+class TPEDeleted(BaseModel):
+    id: int
+    shop_id: str
+    deleted_at: Optional[datetime] = None
+
+
+class TPEChanges(BaseModel):
+    items: List[TPE]
+    deleted: List[TPEDeleted]
+    next_token: str
+    has_more: bool
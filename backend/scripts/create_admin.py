@@ -10,7 +10,7 @@ import os
 # Ajouter le répertoire parent au path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import SessionLocal, init_db
+from database import SessionLocal
 import crud
 import schemas
 
@@ -19,9 +19,6 @@ def create_admin():
     """Créer un utilisateur administrateur"""
     print("=== TPE Manager - Création d'administrateur ===\n")
     
-    # Initialiser la base de données
-    init_db()
-    
     # Obtenir une session
     db = SessionLocal()
     
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les compteurs statistiques des TPE
+Usage: python rebuild_stats.py [--check]
+"""
+
+import argparse
+import sys
+import os
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+import stats
+
+
+def check_counters(db) -> int:
+    """Vérifier la cohérence des compteurs sans les modifier"""
+    drift = stats.check_drift(db)
+    if not drift:
+        print("✓ Compteurs cohérents avec la table tpes")
+        return 0
+    
+    print("❌ Dérive détectée :")
+    for field, values in drift.items():
+        print(f"  - {field}: stocké={values['stored']} réel={values['actual']}")
+    return 1
+
+
+def rebuild_counters(db) -> int:
+    """Recalculer entièrement les compteurs"""
+    values = stats.rebuild(db)
+    print("✓ Compteurs reconstruits :")
+    for field, value in values.items():
+        print(f"  - {field}: {value}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compteurs statistiques des TPE")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Signaler la dérive sans reconstruire (code retour 1 si dérive)"
+    )
+    args = parser.parse_args()
+    
+    print("=== TPE Manager - Compteurs statistiques ===\n")
+    
+    db = SessionLocal()
+    try:
+        if args.check:
+            return check_counters(db)
+        return rebuild_counters(db)
+    except Exception as e:
+        print(f"\n❌ Erreur: {str(e)}")
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
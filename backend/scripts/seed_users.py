@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script pour créer les utilisateurs par défaut (admin / user)
+Usage: python seed_users.py
+
+À exécuter une fois après ``alembic upgrade head`` : les workers de l'API ne
+créent plus ces comptes au démarrage.
+"""
+
+import sys
+import os
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+import crud
+import schemas
+
+DEFAULT_USERS = [
+    schemas.UserCreate(
+        username="admin",
+        email="admin@example.com",
+        password="admin123",
+        role="admin"
+    ),
+    schemas.UserCreate(
+        username="user",
+        email="user@example.com",
+        password="user123",
+        role="user"
+    ),
+]
+
+
+def seed_users():
+    """Créer les comptes par défaut manquants"""
+    db = SessionLocal()
+    try:
+        for user_data in DEFAULT_USERS:
+            if crud.get_user_by_username(db, user_data.username):
+                continue
+            crud.create_user(db, user_data)
+            print(f"✓ User created (username: {user_data.username}, password: {user_data.password})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    seed_users()
@@ -0,0 +1,87 @@
+"""
+Recherche plein texte des TPE
+
+Chaque TPE porte une colonne ``search_text`` : un document normalisé (minuscules,
+sans accents) regroupant nom du service, ShopID, régisseurs et cartes
+commerçants. Sous PostgreSQL, un index GIN pg_trgm sert les recherches
+``LIKE '%terme%'`` et ``word_similarity`` classe les résultats ; sous SQLite
+(tests), la même requête s'exécute sans index avec un classement simplifié.
+"""
+import unicodedata
+from typing import Any, List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+import models
+
+TRGM_INDEX_NAME = "ix_tpes_search_text_trgm"
+
+# Séparateur entre les champs du document de recherche
+FIELD_SEPARATOR = " | "
+
+
+def normalize(value: Optional[str]) -> str:
+    """Minuscules, accents retirés, espaces compactés"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def _value(tpe: Any, field: str) -> Any:
+    if isinstance(tpe, dict):
+        return tpe.get(field)
+    return getattr(tpe, field, None)
+
+
+def build_document(tpe: Any) -> str:
+    """Construire le document de recherche d'un TPE (objet ORM ou dict)"""
+    # Le nom du service vient en premier : un préfixe du document est un
+    # préfixe du nom, ce qui sert au classement
+    parts = [
+        _value(tpe, "service_name"),
+        _value(tpe, "shop_id"),
+        " ".join(filter(None, [_value(tpe, "regisseur_prenom"), _value(tpe, "regisseur_nom")])),
+    ]
+    
+    cards = _value(tpe, "merchant_cards")
+    if isinstance(cards, list):
+        for card in cards:
+            if isinstance(card, dict):
+                parts.append(card.get("numero"))
+                parts.append(card.get("numero_serie_tpe"))
+    
+    return FIELD_SEPARATOR.join(normalize(part) for part in parts if part)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_query(query, term: str):
+    """Restreindre une requête aux TPE dont le document contient le terme"""
+    normalized = normalize(term)
+    if not normalized:
+        return query
+    return query.filter(
+        models.TPE.search_text.like(f"%{_escape_like(normalized)}%", escape="\\")
+    )
+
+
+def rank_order(db: Session, term: str) -> List[Any]:
+    """Critères ORDER BY classant les résultats par pertinence"""
+    normalized = normalize(term)
+    if not normalized:
+        return []
+    
+    document = models.TPE.search_text
+    # ShopID exact, puis nom de service commençant par le terme
+    ordering = [
+        case((func.lower(models.TPE.shop_id) == normalized, 0), else_=1),
+        case((document.like(f"{_escape_like(normalized)}%", escape="\\"), 0), else_=1),
+    ]
+    if db.get_bind().dialect.name == "postgresql":
+        ordering.append(func.word_similarity(normalized, document).desc())
+    ordering.append(models.TPE.id)
+    return ordering
+
@@ -0,0 +1,91 @@
+"""
+Sérialisation directe des TPE lus en base (chemin rapide des lectures)
+
+Le chemin standard construit un ``schemas.TPE`` par ligne
+(``from_attributes``, revalidation des cartes commerçants et d'``EmailStr``),
+le convertit en dict, puis FastAPI le revalide contre ``response_model``
+avant de l'encoder. Les lignes de la base ont déjà été validées à
+l'écriture : ici, seuls les champs publics sont projetés dans un dict JSON
+identique à celui de ``schemas.TPE.model_dump(mode="json")``, encodé par
+orjson lorsqu'il est installé (json sinon).
+
+Comparer les deux chemins : ``python benchmarks/bench_serialization.py``.
+"""
+import json
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+import schemas
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+# Champs de la réponse publique, dans l'ordre du schéma
+TPE_FIELDS = tuple(schemas.TPE.model_fields)
+
+# Colonnes affichées par le tableau de la liste (fields=summary)
+SUMMARY_FIELDS = (
+    "id", "service_name", "shop_id", "regisseur_prenom", "regisseur_nom",
+    "tpe_model", "number_of_tpe", "connection_ethernet", "connection_4g5g",
+)
+
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def parse_fields(value: str) -> Tuple[str, ...]:
+    """Champs demandés (noms séparés par des virgules ou summary), id toujours inclus"""
+    if value.strip() == "summary":
+        return SUMMARY_FIELDS
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = sorted(requested.difference(TPE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    requested.add("id")
+    # Ordre du schéma : même réponse quel que soit l'ordre demandé
+    return tuple(field for field in TPE_FIELDS if field in requested)
+
+
+def isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Date au format de pydantic (UTC noté Z)"""
+    if value is None:
+        return None
+    text = value.isoformat()
+    if text.endswith("+00:00"):
+        return text[:-6] + "Z"
+    return text
+
+
+def tpe_to_dict(tpe, fields: Sequence[str] = TPE_FIELDS) -> dict:
+    """Projection JSON d'un TPE de la base (objet ORM ou ligne), sans revalidation"""
+    data = {field: getattr(tpe, field) for field in fields}
+    if "merchant_cards" in data:
+        data["merchant_cards"] = [
+            {"numero": card["numero"], "numero_serie_tpe": card["numero_serie_tpe"]}
+            for card in data["merchant_cards"] or []
+        ]
+    for field in _DATETIME_FIELDS:
+        if field in data:
+            data[field] = isoformat(data[field])
+    return data
+
+
+def tpes_to_list(tpes: Iterable, fields: Sequence[str] = TPE_FIELDS) -> List[dict]:
+    return [tpe_to_dict(tpe, fields) for tpe in tpes]
+
+
+def dumps(content: Any) -> bytes:
+    """Encodage JSON compact (orjson si disponible)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON déjà sérialisable : ni revalidation ni jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
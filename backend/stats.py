@@ -0,0 +1,220 @@
+"""
+Compteurs statistiques des TPE
+
+La table ``tpe_stats`` contient une ligne unique de compteurs, ajustés dans la
+même transaction que chaque écriture sur ``tpes`` : la lecture du tableau de
+bord est en O(1). ``compute_stats`` reste la référence (une seule agrégation)
+pour reconstruire les compteurs et détecter une dérive.
+
+La même ligne porte la version de la table ``tpes`` : incrémentée par chaque
+écriture, elle sert de validateur HTTP (ETag) aux lectures de la liste et des
+statistiques.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import and_, case, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import cache
+import models
+import schemas
+
+COUNTER_ID = 1
+COUNTER_FIELDS = list(schemas.TPEStats.model_fields)
+
+DESK_MODEL = "Ingenico Desk 5000"
+MOVE_MODEL = "Ingenico Move 5000"
+
+
+def _merchant_cards_length(db: Session):
+    """Longueur du tableau JSON merchant_cards (0 si absent ou non tableau)"""
+    cards = models.TPE.merchant_cards
+    if db.get_bind().dialect.name == "postgresql":
+        is_array = func.json_typeof(cards) == "array"
+    else:
+        is_array = func.json_type(cards) == "array"
+    return case((is_array, func.json_array_length(cards)), else_=0)
+
+
+def compute_stats(db: Session, *criteria) -> dict:
+    """Recalculer les statistiques en une seule agrégation (éventuellement filtrée)"""
+    tpe = models.TPE
+    is_desk = tpe.tpe_model == DESK_MODEL
+    is_move = tpe.tpe_model == MOVE_MODEL
+    ethernet = tpe.connection_ethernet.is_(True)
+    mobile = tpe.connection_4g5g.is_(True)
+    no_ethernet = tpe.connection_ethernet.is_not(True)
+    no_mobile = tpe.connection_4g5g.is_not(True)
+    cards_length = _merchant_cards_length(db)
+    
+    row = db.query(
+        func.count().label("total"),
+        func.count().filter(is_desk).label("desk_count"),
+        func.count().filter(is_move).label("move_count"),
+        func.count().filter(ethernet).label("ethernet_count"),
+        func.count().filter(mobile).label("mobile_count"),
+        func.count().filter(tpe.backoffice_active == True).label("backoffice_active_count"),
+        func.coalesce(func.sum(tpe.number_of_tpe), 0).label("total_terminals"),
+        func.coalesce(func.sum(tpe.number_of_tpe).filter(is_desk), 0).label("desk_terminals"),
+        func.coalesce(func.sum(tpe.number_of_tpe).filter(is_move), 0).label("move_terminals"),
+        func.count().filter(and_(ethernet, mobile)).label("both_connections_count"),
+        func.count().filter(and_(ethernet, no_mobile)).label("ethernet_only_count"),
+        func.count().filter(and_(mobile, no_ethernet)).label("mobile_only_count"),
+        func.count().filter(and_(no_ethernet, no_mobile)).label("no_connection_count"),
+        func.coalesce(func.sum(cards_length), 0).label("merchant_cards_count"),
+        func.count().filter(cards_length > 0).label("with_merchant_cards_count"),
+    ).filter(*criteria).one()
+    
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def _value(tpe: Any, field: str) -> Any:
+    if isinstance(tpe, dict):
+        return tpe.get(field)
+    return getattr(tpe, field, None)
+
+
+def contribution(tpe: Any) -> Dict[str, int]:
+    """Compteurs apportés par un TPE (objet ORM ou dictionnaire de colonnes)"""
+    model = _value(tpe, "tpe_model")
+    terminals = _value(tpe, "number_of_tpe") or 0
+    ethernet = _value(tpe, "connection_ethernet") is True
+    mobile = _value(tpe, "connection_4g5g") is True
+    cards = _value(tpe, "merchant_cards")
+    cards_count = len(cards) if isinstance(cards, list) else 0
+    
+    return {
+        "total": 1,
+        "desk_count": int(model == DESK_MODEL),
+        "move_count": int(model == MOVE_MODEL),
+        "ethernet_count": int(ethernet),
+        "mobile_count": int(mobile),
+        "backoffice_active_count": int(_value(tpe, "backoffice_active") is True),
+        "total_terminals": terminals,
+        "desk_terminals": terminals if model == DESK_MODEL else 0,
+        "move_terminals": terminals if model == MOVE_MODEL else 0,
+        "both_connections_count": int(ethernet and mobile),
+        "ethernet_only_count": int(ethernet and not mobile),
+        "mobile_only_count": int(mobile and not ethernet),
+        "no_connection_count": int(not ethernet and not mobile),
+        "merchant_cards_count": cards_count,
+        "with_merchant_cards_count": int(cards_count > 0),
+    }
+
+
+def diff(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    """Delta entre deux contributions, limité aux compteurs modifiés"""
+    return {
+        field: after[field] - before[field]
+        for field in COUNTER_FIELDS
+        if after[field] != before[field]
+    }
+
+
+def add(*deltas: Dict[str, int]) -> Dict[str, int]:
+    """Somme de plusieurs deltas"""
+    total = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            total[field] = total.get(field, 0) + value
+    return total
+
+
+def negate(values: Dict[str, int]) -> Dict[str, int]:
+    """Inverser une contribution (suppression)"""
+    return {field: -value for field, value in values.items()}
+
+
+def apply_delta(db: Session, delta: Dict[str, int]) -> None:
+    """Ajuster les compteurs et la version de la table dans la transaction courante"""
+    counters = models.TPEStatsCounter
+    values = {
+        field: getattr(counters, field) + value
+        for field, value in delta.items()
+        if value
+    }
+    # Toute écriture change la version, même sans effet sur les compteurs
+    values["version"] = counters.version + 1
+    values["updated_at"] = func.now()
+    
+    result = db.execute(update(counters).where(counters.id == COUNTER_ID).values(values))
+    if result.rowcount:
+        return
+    
+    # Ligne absente : la créer depuis l'état courant, qui inclut déjà cette
+    # écriture (appelée après elle). Créée entre-temps par une autre
+    # transaction : elle n'a pas vu cette écriture, appliquer le delta.
+    if not _insert_row(db, dict(compute_stats(db), version=1)):
+        db.execute(update(counters).where(counters.id == COUNTER_ID).values(values))
+
+
+def _insert_row(db: Session, values: Dict[str, Any]) -> bool:
+    """Créer la ligne des compteurs si elle n'existe pas (INSERT ... ON CONFLICT DO NOTHING)"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    result = db.execute(
+        dialect.insert(models.TPEStatsCounter)
+        .values(id=COUNTER_ID, **values)
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    return bool(result.rowcount)
+
+
+def read_counters(db: Session) -> Dict[str, int]:
+    """Lire les compteurs (reconstruits s'ils n'existent pas encore)"""
+    row = db.get(models.TPEStatsCounter, COUNTER_ID)
+    if row is None:
+        return rebuild(db)
+    return {field: getattr(row, field) for field in COUNTER_FIELDS}
+
+
+def read_version(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Version de la table tpes et date de sa dernière écriture"""
+    counters = models.TPEStatsCounter
+    row = db.query(counters.version, counters.updated_at).filter(counters.id == COUNTER_ID).first()
+    if row is None:
+        rebuild(db)
+        row = db.query(counters.version, counters.updated_at).filter(counters.id == COUNTER_ID).first()
+    return row.version, row.updated_at
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """Recalculer entièrement les compteurs depuis la table tpes"""
+    # Les réponses en cache (/stats/summary) sont périmées avec les compteurs.
+    # Étiquette verrouillée avant tpe_stats, comme dans les écritures de crud
+    # (cache_tags, puis tpe_stats) : pas d'interblocage avec elles
+    cache.invalidate(db, cache.TPES_TAG)
+    
+    # Première lecture concurrente : une seule transaction crée la ligne,
+    # les autres attendent son commit puis la verrouillent à leur tour
+    _insert_row(db, dict.fromkeys(COUNTER_FIELDS, 0))
+    
+    # Verrouiller la ligne avant l'agrégation : les écritures concurrentes
+    # appliquent leur delta après notre commit, sur une base à jour
+    row = (
+        db.query(models.TPEStatsCounter)
+        .filter(models.TPEStatsCounter.id == COUNTER_ID)
+        .with_for_update()
+        .one()
+    )
+    values = compute_stats(db)
+    
+    # Les statistiques servies peuvent changer : invalider les ETag
+    row.version += 1
+    for field, value in values.items():
+        setattr(row, field, value)
+    
+    db.commit()
+    return values
+
+
+def check_drift(db: Session) -> Dict[str, Dict[str, int]]:
+    """Comparer les compteurs stockés à une agrégation complète"""
+    row = db.get(models.TPEStatsCounter, COUNTER_ID)
+    actual = compute_stats(db)
+    
+    drift = {}
+    for field in COUNTER_FIELDS:
+        stored = getattr(row, field) if row is not None else None
+        if stored != actual[field]:
+            drift[field] = {"stored": stored, "actual": actual[field]}
+    return drift
@@ -0,0 +1,107 @@
+"""
+Index de suggestions en mémoire (recherche à la frappe)
+
+Tableau trié de couples (clé normalisée, id) interrogé par ``bisect`` : les
+clés sont le ShopID et chaque suffixe de mots du nom de service, de sorte que
+« pisc » trouve aussi « Crèche piscine ». L'index est construit au démarrage,
+tenu à jour par les écritures de ``crud`` et reconstruit périodiquement pour
+rattraper les écritures faites par les autres workers.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+import models
+from search import normalize
+
+
+def _keys_for(service_name: Optional[str], shop_id: Optional[str]) -> Set[str]:
+    """Clés indexées pour un TPE"""
+    words = normalize(service_name).split()
+    keys = {" ".join(words[start:]) for start in range(len(words))}
+    if shop_id:
+        keys.add(normalize(shop_id))
+    return keys
+
+
+class SuggestionIndex:
+    """Index de préfixes trié, sûr entre threads"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[str, int]] = []
+        self._entries: Dict[int, Tuple[str, str, Set[str]]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def rebuild(self, rows: Iterable[Tuple[int, str, str]]) -> None:
+        """Remplacer tout le contenu de l'index"""
+        entries = {}
+        keys = []
+        for tpe_id, service_name, shop_id in rows:
+            tpe_keys = _keys_for(service_name, shop_id)
+            entries[tpe_id] = (service_name, shop_id, tpe_keys)
+            keys.extend((key, tpe_id) for key in tpe_keys)
+        keys.sort()
+        
+        with self._lock:
+            self._keys = keys
+            self._entries = entries
+    
+    def _discard(self, tpe_id: int) -> None:
+        entry = self._entries.pop(tpe_id, None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            position = bisect_left(self._keys, (key, tpe_id))
+            if position < len(self._keys) and self._keys[position] == (key, tpe_id):
+                del self._keys[position]
+    
+    def upsert(self, tpe_id: int, service_name: str, shop_id: str) -> None:
+        """Ajouter ou mettre à jour un TPE"""
+        tpe_keys = _keys_for(service_name, shop_id)
+        with self._lock:
+            self._discard(tpe_id)
+            self._entries[tpe_id] = (service_name, shop_id, tpe_keys)
+            for key in tpe_keys:
+                insort(self._keys, (key, tpe_id))
+    
+    def remove(self, tpe_id: int) -> None:
+        """Retirer un TPE"""
+        with self._lock:
+            self._discard(tpe_id)
+    
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """Premiers TPE dont une clé commence par la saisie"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        
+        results = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix, -1))
+            while position < len(self._keys) and len(results) < limit:
+                key, tpe_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if tpe_id not in seen:
+                    seen.add(tpe_id)
+                    service_name, shop_id, _ = self._entries[tpe_id]
+                    results.append({"id": tpe_id, "service_name": service_name, "shop_id": shop_id})
+                position += 1
+        return results
+
+
+index = SuggestionIndex()
+
+
+def load(db: Session, batch_size: int = 5000) -> int:
+    """Construire l'index depuis la base"""
+    rows = (
+        db.query(models.TPE.id, models.TPE.service_name, models.TPE.shop_id)
+        .yield_per(batch_size)
+    )
+    index.rebuild((tpe_id, service_name, shop_id) for tpe_id, service_name, shop_id in rows)
+    return len(index)
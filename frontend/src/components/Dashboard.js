@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { tpeAPI } from '../services/api';
+import { tpeAPI, subscribeToTPEEvents } from '../services/api';
 import { toast } from 'react-toastify';
 import { FaServer, FaDesktop, FaMobileAlt, FaNetworkWired, FaSignal, FaEnvelope } from 'react-icons/fa';
 
@@ -12,6 +12,19 @@ const Dashboard = () => {
     loadStats();
   }, []);
 
+  // Statistiques rechargées après chaque modification (regroupées sur 1 s)
+  useEffect(() => {
+    let timer = null;
+    const unsubscribe = subscribeToTPEEvents(() => {
+      clearTimeout(timer);
+      timer = setTimeout(loadStats, 1000);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   const loadStats = async () => {
     try {
       const data = await tpeAPI.getStats();
@@ -1,6 +1,6 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { tpeAPI } from '../services/api';
+import { tpeAPI, subscribeToTPEEvents } from '../services/api';
 import { toast } from 'react-toastify';
 import { FaEdit, FaTrash, FaPlus, FaFileExcel, FaSearch } from 'react-icons/fa';
 
@@ -14,17 +14,21 @@ const TPEList = () => {
   
   // Filtres
   const [search, setSearch] = useState('');
+  const [searchInput, setSearchInput] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
   const [tpeModel, setTpeModel] = useState('');
   const [connectionType, setConnectionType] = useState('');
   
   const navigate = useNavigate();
 
-  const loadTpes = useCallback(async () => {
-    setLoading(true);
+  const loadTpes = useCallback(async ({ quiet = false } = {}) => {
+    if (!quiet) setLoading(true);
     try {
       const params = {
         page,
         page_size: pageSize,
+        // Seules les colonnes du tableau
+        fields: 'summary',
       };
       
       if (search) params.search = search;
@@ -46,6 +50,52 @@ const TPEList = () => {
     loadTpes();
   }, [loadTpes]);
 
+  // Mises à jour en direct : une ligne modifiée est corrigée sur place, les
+  // autres changements (ajout, suppression, masse) rechargent la page
+  const loadTpesRef = useRef(loadTpes);
+  loadTpesRef.current = loadTpes;
+
+  useEffect(() => {
+    let timer = null;
+    const unsubscribe = subscribeToTPEEvents((event) => {
+      if (event.type === 'tpe.updated') {
+        setTpes((current) => current.map((tpe) => (tpe.id === event.id ? { ...tpe, ...event.tpe } : tpe)));
+        return;
+      }
+      clearTimeout(timer);
+      timer = setTimeout(() => loadTpesRef.current({ quiet: true }), 500);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
+  // Suggestions à la frappe (index en mémoire, sans requête de liste)
+  useEffect(() => {
+    if (!searchInput.trim()) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    tpeAPI.suggest(searchInput)
+      .then((data) => {
+        if (!cancelled) setSuggestions(data);
+      })
+      .catch(() => {
+        if (!cancelled) setSuggestions([]);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [searchInput]);
+
+  const applySearch = (value) => {
+    if (value === search) return;
+    setSearch(value);
+    setPage(1);
+  };
+
   const handleDelete = async (id) => {
     if (window.confirm('Are you sure you want to delete this TPE?')) {
       try {
@@ -76,6 +126,7 @@ const TPEList = () => {
 
   const resetFilters = () => {
     setSearch('');
+    setSearchInput('');
     setTpeModel('');
     setConnectionType('');
     setPage(1);
@@ -111,12 +162,28 @@ const TPEList = () => {
                   type="text"
                   className="form-control"
                   placeholder="Service name or ShopID..."
-                  value={search}
+                  list="tpe-suggestions"
+                  value={searchInput}
                   onChange={(e) => {
-                    setSearch(e.target.value);
-                    setPage(1);
+                    const value = e.target.value;
+                    setSearchInput(value);
+                    // Suggestion choisie ou champ vidé : appliquer le filtre
+                    if (!value || suggestions.some((s) => s.shop_id === value || s.service_name === value)) {
+                      applySearch(value);
+                    }
+                  }}
+                  onKeyDown={(e) => {
+                    if (e.key === 'Enter') applySearch(searchInput);
                   }}
+                  onBlur={() => applySearch(searchInput)}
                 />
+                <datalist id="tpe-suggestions">
+                  {suggestions.map((s) => (
+                    <option key={s.id} value={s.service_name}>
+                      {s.shop_id}
+                    </option>
+                  ))}
+                </datalist>
               </div>
             </div>
             
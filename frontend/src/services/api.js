@@ -80,11 +80,36 @@ export const tpeAPI = {
     await api.delete(`/tpe/${id}`);
   },
   
+  suggest: async (q, limit = 10) => {
+    const response = await api.get('/tpe/suggest', { params: { q, limit } });
+    return response.data;
+  },
+  
+  bulkUpdate: async (selection, changes) => {
+    const response = await api.patch('/tpe/bulk', { ...selection, changes });
+    return response.data;
+  },
+  
+  bulkDelete: async (selection) => {
+    const response = await api.delete('/tpe/bulk', { data: selection });
+    return response.data;
+  },
+  
   getStats: async () => {
     const response = await api.get('/tpe/stats/summary');
     return response.data;
   },
   
+  importFile: async (file, dryRun = false) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post('/tpe/import', formData, {
+      params: { dry_run: dryRun },
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+  
   exportExcel: async () => {
     const response = await api.get('/tpe/export/excel', {
       responseType: 'blob',
@@ -93,6 +118,59 @@ export const tpeAPI = {
   },
 };
 
+// Événements des TPE (Server-Sent Events)
+// EventSource ne transmet pas l'en-tête Authorization : le flux est lu avec
+// fetch. Reconnexion automatique ; un resync est émis après chaque reprise,
+// les événements de la coupure étant perdus.
+export const subscribeToTPEEvents = (onEvent) => {
+  const controller = new AbortController();
+  let retryDelay = 5000;
+  let connected = false;
+
+  const dispatch = (block) => {
+    let data = '';
+    block.split('\n').forEach((line) => {
+      if (line.startsWith('data:')) data += line.slice(5).trim();
+      if (line.startsWith('retry:')) retryDelay = parseInt(line.slice(6), 10) || retryDelay;
+    });
+    if (data) onEvent(JSON.parse(data));
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const response = await fetch(`${API_URL}/tpe/events`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+          signal: controller.signal,
+        });
+        if (response.status === 401) return;
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        if (connected) onEvent({ type: 'resync' });
+        connected = true;
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const blocks = buffer.split('\n\n');
+          buffer = blocks.pop();
+          blocks.forEach(dispatch);
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryDelay));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
+
 // Users API
 export const usersAPI = {
   getAll: async () => {
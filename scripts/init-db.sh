@@ -11,7 +11,9 @@ done
 
 echo "PostgreSQL is up - initializing database"
 
-# Exécuter les migrations Alembic si nécessaire
-# cd /app/backend && alembic upgrade head
+# Appliquer les migrations puis créer les comptes par défaut
+cd /app/backend || cd /app
+alembic upgrade head || exit 1
+python scripts/seed_users.py || exit 1
 
 echo "Database initialization complete"